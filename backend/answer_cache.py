@@ -0,0 +1,126 @@
+import json
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from metrics import record_cache_lookups
+
+
+def load_prompt_response_pairs(path: str) -> List[Tuple[str, str]]:
+    """Flatten docs/prompt_response_pairs.json ({category: [{prompt, response}, ...]}) into pairs."""
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    categories = data.values() if isinstance(data, dict) else [data]
+    return [(pair["prompt"], pair["response"])
+            for pairs in categories for pair in pairs
+            if pair.get("prompt") and pair.get("response")]
+
+
+def normalize(vectors) -> np.ndarray:
+    matrix = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+class SemanticAnswerCache():
+    """
+    Returns a stored answer when a new question is close enough (cosine) to a known one.
+
+    Curated pairs are pinned; answers generated by the LLM are kept in a fixed number of
+    slots and evicted least recently used first. Generated answers depend on the
+    conversation they were produced in, so callers only add them, and only match against
+    them (include_generated), for the opening question of a session.
+    """
+
+    def __init__(self, embeddings: Embeddings, threshold: float = 0.95, max_generated: int = 500):
+        self.embeddings = embeddings
+        self.threshold = threshold
+        self.max_generated = max_generated
+        self.hits = 0
+        self.misses = 0
+        self.__lock = threading.Lock()
+        self.__curated_vectors: Optional[np.ndarray] = None
+        self.__curated_answers: List[str] = []
+        self.__generated_vectors: Optional[np.ndarray] = None
+        self.__generated_answers: List[Optional[str]] = [None] * max_generated
+        # question -> slot, oldest first
+        self.__generated_slots: "OrderedDict[str, int]" = OrderedDict()
+
+    # PRIVATE METHODS #
+    def __best_match(self, vector: np.ndarray,
+                     include_generated: bool = True) -> Tuple[float, Optional[str], Optional[int]]:
+        best_score, best_answer, best_slot = -1.0, None, None
+        if self.__curated_vectors is not None and len(self.__curated_answers):
+            scores = self.__curated_vectors @ vector
+            index = int(np.argmax(scores))
+            best_score, best_answer = float(scores[index]), self.__curated_answers[index]
+        if include_generated and self.__generated_slots:
+            slots = np.fromiter(self.__generated_slots.values(), dtype=np.int64)
+            scores = self.__generated_vectors[slots] @ vector
+            index = int(np.argmax(scores))
+            if scores[index] > best_score:
+                best_slot = int(slots[index])
+                best_score, best_answer = float(scores[index]), self.__generated_answers[best_slot]
+        return best_score, best_answer, best_slot
+
+    # PUBLIC METHODS #
+    def seed(self, pairs: List[Tuple[str, str]]) -> None:
+        if not pairs:
+            return
+        prompts = [prompt for prompt, _ in pairs]
+        vectors = normalize(self.embeddings.embed_documents(prompts))
+        with self.__lock:
+            self.__curated_vectors = vectors
+            self.__curated_answers = [response for _, response in pairs]
+
+    def lookup(self, question: str, include_generated: bool = True,
+               embedding: Optional[List[float]] = None) -> Optional[str]:
+        """embedding, if given, is the question's already computed query embedding."""
+        vector = normalize(embedding if embedding is not None else self.embeddings.embed_query(question))[0]
+        with self.__lock:
+            score, answer, slot = self.__best_match(vector, include_generated)
+            if answer is None or score < self.threshold:
+                self.misses += 1
+                record_cache_lookups("answer", 0, 1)
+                return None
+            if slot is not None:
+                for key, value in self.__generated_slots.items():
+                    if value == slot:
+                        self.__generated_slots.move_to_end(key)
+                        break
+            self.hits += 1
+            record_cache_lookups("answer", 1, 0)
+            return answer
+
+    def add(self, question: str, answer: str, embedding: Optional[List[float]] = None) -> None:
+        if self.max_generated <= 0:
+            return
+        vector = normalize(embedding if embedding is not None else self.embeddings.embed_query(question))[0]
+        with self.__lock:
+            if self.__generated_vectors is None:
+                self.__generated_vectors = np.zeros((self.max_generated, vector.shape[0]), dtype=np.float32)
+
+            if question in self.__generated_slots:
+                slot = self.__generated_slots.pop(question)
+            elif len(self.__generated_slots) < self.max_generated:
+                slot = len(self.__generated_slots)
+            else:
+                _, slot = self.__generated_slots.popitem(last=False)
+
+            self.__generated_vectors[slot] = vector
+            self.__generated_answers[slot] = answer
+            self.__generated_slots[question] = slot
+
+    def stats(self) -> Dict[str, float]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            "curated_entries": len(self.__curated_answers),
+            "generated_entries": len(self.__generated_slots),
+        }
@@ -1,7 +1,13 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify, stream_with_context
 from flask_cors import CORS
 from model import RAG
+from speech_client import SpeechClient, CachedResource, RequestBodyStream, iter_response_body
+from speech_pipeline import stream_answer_with_audio
+from metrics import REQUEST_SECONDS, REQUESTS_IN_FLIGHT, metrics_payload, stage
 import os
+import json
+import time
+import uuid
 import requests
 import logging
 
@@ -13,21 +19,103 @@ app = Flask(__name__)
 # Enable CORS for all domains with more permissive settings
 CORS(app, resources={r"/*": {"origins": "*", "allow_headers": "*", "expose_headers": "*"}})
 
-# Initialize RAG system
-rag = RAG(
-    docs_dir='/app/docs',
+# Initialize RAG system. Spawned ingestion workers re-import this script as __mp_main__
+# when it is run directly (python api.py); they must not build (and sync) a RAG of their own.
+rag = None if __name__ == '__mp_main__' else RAG(
+    docs_dir=os.getenv('RAG_DOCS_DIR', '/app/docs'),
     n_retrievals=4,
     chat_max_tokens=3097,
     creativeness=1.2,
+    # Under gunicorn the master process has already synced the documents
+    sync_on_start=os.getenv('RAG_SYNC_ON_START', '1') == '1',
+    use_answer_cache=os.getenv('RAG_ANSWER_CACHE', '1') == '1',
 )
 
 # Speech service URLs (configured via environment variables)
 TTS_SERVICE_URL = os.getenv('TTS_SERVICE_URL', 'http://tts-service:8001')
 STT_SERVICE_URL = os.getenv('STT_SERVICE_URL', 'http://stt-service:8002')
 
+# Pooled keep-alive clients, one per upstream speech service
+SPEECH_POOL_SIZE = int(os.getenv('SPEECH_POOL_SIZE', '16'))
+SPEECH_RETRIES = int(os.getenv('SPEECH_RETRIES', '3'))
+tts_client = SpeechClient(TTS_SERVICE_URL, pool_size=SPEECH_POOL_SIZE, retries=SPEECH_RETRIES)
+stt_client = SpeechClient(STT_SERVICE_URL, pool_size=SPEECH_POOL_SIZE, retries=SPEECH_RETRIES)
+
+# Voice and language lists never change at runtime: cache them here and let browsers/nginx cache them too
+STATIC_CACHE_TTL = int(os.getenv('SPEECH_STATIC_CACHE_TTL', '300'))
+STATIC_STALE_TTL = int(os.getenv('SPEECH_STATIC_STALE_TTL', '86400'))
+
+def fetch_json(client: SpeechClient, path: str) -> dict:
+    response = client.get(path, timeout=10)
+    response.raise_for_status()
+    return response.json()
+
+voices_cache = CachedResource(lambda: fetch_json(tts_client, "/voices"), ttl=STATIC_CACHE_TTL, stale_ttl=STATIC_STALE_TTL)
+languages_cache = CachedResource(lambda: fetch_json(stt_client, "/languages"), ttl=STATIC_CACHE_TTL, stale_ttl=STATIC_STALE_TTL)
+
+def cached_json_response(resource: CachedResource):
+    """Serve a cached upstream payload with ETag / Cache-Control, answering 304 on a matching If-None-Match"""
+    payload, etag = resource.get()
+    headers = {
+        'ETag': etag,
+        'Cache-Control': f'public, max-age={STATIC_CACHE_TTL}, '
+                         f'stale-while-revalidate={STATIC_STALE_TTL}, stale-if-error={STATIC_STALE_TTL}'
+    }
+    # ETags holds unquoted values; weak matches count too, since proxies weaken ETags when they compress
+    if request.if_none_match.contains_weak(etag.strip('"')):
+        return Response(status=304, headers=headers)
+    return jsonify(payload), 200, headers
+
+def get_session_id() -> str:
+    """Session ID from the X-Session-ID header or the request body; a fresh one if the client sent none"""
+    session_id = request.headers.get('X-Session-ID')
+    if not session_id and request.is_json:
+        session_id = (request.get_json(silent=True) or {}).get('session_id')
+    if not session_id:
+        session_id = request.form.get('session_id')
+    return session_id or str(uuid.uuid4())
+
+def request_id_header() -> dict:
+    """Forwarded to the speech services so their logs and timings can be matched to this request"""
+    return {'X-Request-ID': g.request_id}
+
+@app.before_request
+def start_request():
+    g.request_id = request.headers.get('X-Request-ID') or uuid.uuid4().hex
+    g.started = time.perf_counter()
+    if request.endpoint != 'metrics':
+        REQUESTS_IN_FLIGHT.labels(endpoint=request.endpoint or 'unknown').inc()
+
+@app.after_request
+def echo_session_id(response):
+    # Lets clients that didn't send a session ID keep the conversation going
+    session_id = g.get('session_id')
+    if session_id:
+        response.headers['X-Session-ID'] = session_id
+    response.headers['X-Request-ID'] = g.request_id
+
+    if request.endpoint != 'metrics':
+        endpoint, method, started, request_id = request.endpoint or 'unknown', request.method, g.started, g.request_id
+
+        # Streamed responses are only finished once the body has been sent
+        def finish():
+            elapsed = time.perf_counter() - started
+            REQUEST_SECONDS.labels(endpoint=endpoint, method=method, status=response.status_code).observe(elapsed)
+            REQUESTS_IN_FLIGHT.labels(endpoint=endpoint).dec()
+            logger.info(f"request_id={request_id} endpoint={endpoint} status={response.status_code} "
+                        f"duration_ms={elapsed * 1000:.0f}")
+        response.call_on_close(finish)
+    return response
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus metrics: per-stage histograms, token counts, cache lookups, in-flight requests"""
+    body, content_type = metrics_payload()
+    return Response(body, content_type=content_type)
+
 @app.route('/health', methods=['GET'])
 def health():
-    return jsonify({"status": "healthy"})
+    return jsonify({"status": "healthy", "caches": rag.get_cache_stats()})
 
 @app.route('/chat', methods=['POST'])
 def chat():
@@ -38,16 +126,51 @@ def chat():
         if not question:
             return jsonify({"error": "Question is required"}), 400
         
-        answer = rag.ask(question)
+        g.session_id = get_session_id()
+        answer = rag.ask(question, session_id=g.session_id)
         
         return jsonify({
             "question": question,
-            "answer": answer
+            "answer": answer,
+            "session_id": g.session_id
         })
     
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+def sse_event(payload: dict, event: str = None) -> str:
+    """Format one Server-Sent Event"""
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(payload)}\n\n"
+
+@app.route('/chat/stream', methods=['POST'])
+def chat_stream():
+    """Stream the answer as SSE: one `data` event per token, then a `done` event with the full answer"""
+    data = request.json or {}
+    question = data.get('question', '')
+
+    if not question:
+        return jsonify({"error": "Question is required"}), 400
+
+    session_id = g.session_id = get_session_id()
+
+    def generate():
+        tokens = []
+        try:
+            for token in rag.ask_stream(question, session_id=session_id):
+                tokens.append(token)
+                yield sse_event({"token": token})
+            yield sse_event({"question": question, "answer": "".join(tokens), "session_id": session_id}, event="done")
+        except Exception as e:
+            logger.error(f"Chat stream error: {str(e)}")
+            yield sse_event({"error": str(e)}, event="error")
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        # Tell nginx not to buffer the stream
+        'X-Accel-Buffering': 'no'
+    })
+
 @app.route('/speech/tts', methods=['POST'])
 def text_to_speech():
     """Convert text to speech using TTS service"""
@@ -60,19 +183,23 @@ def text_to_speech():
         if not text:
             return jsonify({"error": "Text is required"}), 400
         
-        # Forward request to TTS service
-        response = requests.post(
-            f"{TTS_SERVICE_URL}/synthesize",
-            json={"text": text, "voice": voice, "format": format},
-            timeout=30
-        )
+        # Forward request to TTS service and relay the audio as it arrives
+        with stage("tts_proxy"):
+            response = tts_client.post(
+                "/synthesize",
+                json={"text": text, "voice": voice, "format": format},
+                headers=request_id_header(),
+                timeout=30,
+                stream=True
+            )
         
         if response.status_code == 200:
-            return response.content, 200, {
+            return Response(iter_response_body(response), 200, {
                 'Content-Type': f'audio/{format}',
                 'Content-Disposition': f'attachment; filename=speech.{format}'
-            }
+            })
         else:
+            response.close()
             logger.error(f"TTS service error: {response.status_code}")
             return jsonify({"error": "TTS service unavailable"}), 503
             
@@ -87,26 +214,26 @@ def text_to_speech():
 def speech_to_text():
     """Convert speech to text using STT service"""
     try:
-        # Check if audio file is present
-        if 'audio' not in request.files:
+        chunked = request.headers.get('Transfer-Encoding', '').lower() == 'chunked'
+        if not (request.mimetype == 'multipart/form-data' and (request.content_length or chunked)):
             return jsonify({"error": "No audio file provided"}), 400
         
-        audio_file = request.files['audio']
-        language = request.form.get('language', 'auto')
-        
-        # Forward request to STT service
-        files = {'audio': (audio_file.filename, audio_file.stream, audio_file.content_type)}
-        data = {'language': language}
-        
-        response = requests.post(
-            f"{STT_SERVICE_URL}/transcribe",
-            files=files,
-            data=data,
-            timeout=60
-        )
+        # Forward the multipart body to the STT service as-is, without parsing or buffering
+        # the upload here; the STT service validates the audio and language fields.
+        # Uploads without a Content-Length are relayed with chunked transfer encoding.
+        body = RequestBodyStream(request.stream, request.content_length)
+        with stage("stt_proxy"):
+            response = stt_client.post(
+                "/transcribe",
+                data=body if request.content_length else iter(body),
+                headers={'Content-Type': request.content_type, **request_id_header()},
+                timeout=60
+            )
         
         if response.status_code == 200:
             return response.json()
+        elif response.status_code == 400:
+            return response.json(), 400
         else:
             logger.error(f"STT service error: {response.status_code}")
             return jsonify({"error": "STT service unavailable"}), 503
@@ -122,11 +249,10 @@ def speech_to_text():
 def get_voices():
     """Get available TTS voices"""
     try:
-        response = requests.get(f"{TTS_SERVICE_URL}/voices", timeout=10)
-        if response.status_code == 200:
-            return response.json()
-        else:
-            return jsonify({"error": "TTS service unavailable"}), 503
+        return cached_json_response(voices_cache)
+    except requests.exceptions.RequestException as e:
+        logger.error(f"TTS service connection error: {str(e)}")
+        return jsonify({"error": "TTS service unavailable"}), 503
     except Exception as e:
         logger.error(f"Voices endpoint error: {str(e)}")
         return jsonify({"error": str(e)}), 500
@@ -135,18 +261,36 @@ def get_voices():
 def get_languages():
     """Get available STT languages"""
     try:
-        response = requests.get(f"{STT_SERVICE_URL}/languages", timeout=10)
-        if response.status_code == 200:
-            return response.json()
-        else:
-            return jsonify({"error": "STT service unavailable"}), 503
+        return cached_json_response(languages_cache)
+    except requests.exceptions.RequestException as e:
+        logger.error(f"STT service connection error: {str(e)}")
+        return jsonify({"error": "STT service unavailable"}), 503
     except Exception as e:
         logger.error(f"Languages endpoint error: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
+def synthesize_wav(text: str, voice: str, request_id: str) -> bytes:
+    """Synthesize one piece of text with the TTS service"""
+    with stage("tts_sentence"):
+        response = tts_client.post(
+            "/synthesize",
+            json={"text": text, "voice": voice, "format": "wav"},
+            headers={'X-Request-ID': request_id},
+            timeout=30
+        )
+    if response.status_code != 200:
+        raise RuntimeError(f"TTS service error: {response.status_code}")
+    return response.content
+
 @app.route('/chat_with_speech', methods=['POST'])
 def chat_with_speech():
-    """Complete chat pipeline: STT -> RAG -> TTS"""
+    """
+    Complete chat pipeline: STT -> RAG -> TTS, streamed as SSE
+
+    Answer tokens are sent as they are generated (same `data` events as /chat/stream) and
+    each sentence is synthesized as soon as the LLM finishes it, arriving as an `audio`
+    event with base64 WAV data, in order. A final `done` event carries the full answer.
+    """
     try:
         # Handle audio input if provided
         if 'audio' in request.files:
@@ -158,12 +302,14 @@ def chat_with_speech():
             files = {'audio': (audio_file.filename, audio_file.stream, audio_file.content_type)}
             data = {'language': language}
             
-            stt_response = requests.post(
-                f"{STT_SERVICE_URL}/transcribe",
-                files=files,
-                data=data,
-                timeout=60
-            )
+            with stage("stt"):
+                stt_response = stt_client.post(
+                    "/transcribe",
+                    files=files,
+                    data=data,
+                    headers=request_id_header(),
+                    timeout=60
+                )
             
             if stt_response.status_code != 200:
                 return jsonify({"error": "Speech transcription failed"}), 500
@@ -178,35 +324,33 @@ def chat_with_speech():
         if not question:
             return jsonify({"error": "Question is required"}), 400
         
-        # Get answer from RAG
-        answer = rag.ask(question)
-        
-        # Convert answer to speech
-        tts_response = requests.post(
-            f"{TTS_SERVICE_URL}/synthesize",
-            json={"text": answer, "voice": voice, "format": "wav"},
-            timeout=30
-        )
-        
-        if tts_response.status_code != 200:
-            return jsonify({
-                "question": question,
-                "answer": answer,
-                "audio_error": "TTS generation failed"
-            })
-        
-        # Return both text and audio
-        return jsonify({
-            "question": question,
-            "answer": answer,
-            "has_audio": True
-        }), 200, {
-            'X-Audio-Content': 'available'
-        }
+        session_id = g.session_id = get_session_id()
+        request_id = g.request_id
         
     except Exception as e:
         logger.error(f"Chat with speech error: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
+    def generate():
+        yield sse_event({"question": question, "session_id": session_id}, event="question")
+        try:
+            events = stream_answer_with_audio(rag.ask_stream(question, session_id=session_id),
+                                              lambda sentence: synthesize_wav(sentence, voice, request_id))
+            for event, payload in events:
+                if event == "done":
+                    payload = {"question": question, "answer": payload["answer"], "session_id": session_id}
+                elif event == "audio_error":
+                    logger.error(f"TTS failed for sentence {payload['index']}: {payload['error']}")
+                yield sse_event(payload, event=event)
+        except Exception as e:
+            logger.error(f"Chat with speech stream error: {str(e)}")
+            yield sse_event({"error": str(e)}, event="error")
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=8000, debug=True)
\ No newline at end of file
+    # Development server only; production runs under gunicorn (see gunicorn.conf.py)
+    app.run(host='0.0.0.0', port=8000, debug=os.getenv('FLASK_DEBUG', '0') == '1', threaded=True)
\ No newline at end of file
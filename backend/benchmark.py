@@ -0,0 +1,422 @@
+"""
+End-to-end latency benchmark for the backend API, with local stand-ins for every external service.
+
+OpenAI chat and embeddings are replaced by deterministic fakes with configurable latency,
+Milvus by the in-process LocalVectorStore, and the TTS/STT containers by stub HTTP servers.
+The real Flask app (api.py) is served on a local port and driven by N concurrent clients.
+
+    cd backend
+    python benchmark.py --concurrency 1,8 --requests 40 --output benchmark_results/baseline.json
+    python benchmark.py --concurrency 1,8 --requests 40 --compare benchmark_results/baseline.json
+
+Reports p50/p95/p99 latency, throughput and, for the streaming endpoints, time to first
+token (and first audio for /chat_with_speech). Results are saved as JSON; --compare prints
+the change of every metric against a previous run.
+"""
+import io
+import os
+import sys
+import json
+import time
+import wave
+import random
+import hashlib
+import argparse
+import tempfile
+import threading
+from datetime import datetime, timezone
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import numpy as np
+import requests
+from flask import Flask, Response, jsonify, request
+from werkzeug.serving import make_server
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+SCENARIOS = ("chat", "chat_stream", "chat_with_speech", "speech_tts", "speech_stt")
+
+ANSWER_SENTENCES = [
+    "Greet every table within the first minute of seating.",
+    "Repeat the order back to the guest to confirm every detail.",
+    "Check back two bites into the main course and offer refills.",
+    "Carry plates by the rim and serve from the guest's left.",
+    "Present the check only when the guest asks or the table is clearly finished.",
+    "Apologize sincerely, fix the issue quickly and tell a manager.",
+    "Keep your station stocked before the rush so you never leave the floor.",
+    "Mention the daily specials with one appetizing detail each.",
+]
+
+
+class FakeEmbeddings(Embeddings):
+    """Deterministic hash-seeded unit vectors; sleeps latency_ms per call plus per_text_ms per text."""
+
+    def __init__(self, dimensions: int = 256, latency_ms: float = 50, per_text_ms: float = 0.2):
+        self.model = "fake-embeddings"
+        self.dimensions = dimensions
+        self.latency_ms = latency_ms
+        self.per_text_ms = per_text_ms
+
+    def __vector(self, text: str) -> List[float]:
+        seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+        vector = np.random.default_rng(seed).standard_normal(self.dimensions)
+        return (vector / np.linalg.norm(vector)).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        time.sleep((self.latency_ms + self.per_text_ms * len(texts)) / 1000)
+        return [self.__vector(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+class FakeChatModel(BaseChatModel):
+    """Answers with a deterministic pick of canned sentences, streamed word by word at a fixed pace."""
+
+    model_name: str = "fake-chat"
+    temperature: float = 0.0
+    first_token_ms: float = 400
+    token_ms: float = 20
+    answer_sentences: int = 4
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    def __tokens(self, messages: List[BaseMessage]) -> List[str]:
+        seed = int(hashlib.sha256(str(messages[-1].content).encode("utf-8")).hexdigest()[:8], 16)
+        sentences = random.Random(seed).sample(ANSWER_SENTENCES, self.answer_sentences)
+        words = " ".join(sentences).split(" ")
+        return [word if i == 0 else f" {word}" for i, word in enumerate(words)]
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager=None, **kwargs: Any) -> ChatResult:
+        tokens = self.__tokens(messages)
+        time.sleep((self.first_token_ms + self.token_ms * (len(tokens) - 1)) / 1000)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="".join(tokens)))])
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager=None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        for i, token in enumerate(self.__tokens(messages)):
+            time.sleep((self.first_token_ms if i == 0 else self.token_ms) / 1000)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+
+
+def silent_wav(seconds: float, sample_rate: int = 16000) -> bytes:
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(b"\x00\x00" * int(seconds * sample_rate))
+    return buffer.getvalue()
+
+
+def create_stub_speech_app(tts_latency_ms: float, tts_ms_per_char: float, stt_latency_ms: float) -> Flask:
+    """One app answering both the TTS (/synthesize, /voices) and STT (/transcribe, /languages) APIs."""
+    app = Flask("stub_speech")
+
+    @app.route("/health", methods=["GET"])
+    def health():
+        return jsonify({"status": "healthy", "ready": True})
+
+    @app.route("/synthesize", methods=["POST"])
+    def synthesize():
+        text = (request.get_json(silent=True) or {}).get("text", "")
+        time.sleep((tts_latency_ms + tts_ms_per_char * len(text)) / 1000)
+        # ~60 ms of audio per character, like real speech
+        return Response(silent_wav(0.06 * len(text)), mimetype="audio/wav")
+
+    @app.route("/voices", methods=["GET"])
+    def voices():
+        return jsonify({"voices": ["neutral"], "default": "neutral"})
+
+    @app.route("/transcribe", methods=["POST"])
+    def transcribe():
+        audio = request.files.get("audio")
+        if audio is None:
+            return jsonify({"error": "No audio file provided"}), 400
+        audio.read()
+        time.sleep(stt_latency_ms / 1000)
+        return jsonify({"text": "How should I greet guests as they enter the restaurant?",
+                        "language": "en", "success": True})
+
+    @app.route("/languages", methods=["GET"])
+    def languages():
+        return jsonify({"languages": {"en": "English"}})
+
+    return app
+
+
+class ServerThread():
+    """Serve a WSGI app on a free local port from a background thread."""
+
+    def __init__(self, app):
+        self.server = make_server("127.0.0.1", 0, app, threaded=True)
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+
+
+def load_questions(paths: List[str]) -> List[str]:
+    """Prompts from prompt_response_pairs.json-style files, and `question` (or `title`) fields of .jsonl files."""
+    from answer_cache import load_prompt_response_pairs
+
+    questions = []
+    for path in paths:
+        if not os.path.exists(path):
+            print(f"Question file {path} not found, skipping")
+            continue
+        if path.endswith(".jsonl"):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        record = json.loads(line)
+                        question = record.get("question") or record.get("title")
+                        if question:
+                            questions.append(question)
+        else:
+            questions.extend(prompt for prompt, _ in load_prompt_response_pairs(path))
+    if not questions:
+        raise ValueError("No benchmark questions found")
+    return questions
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    return round(float(np.percentile(values, q)), 1) if values else None
+
+
+def read_sse(response: requests.Response) -> Iterator[tuple]:
+    """Yield (event, payload) for each Server-Sent Event of a streamed response."""
+    event, data = None, []
+    for line in response.iter_lines(decode_unicode=True):
+        if line.startswith("event:"):
+            event = line[len("event:"):].strip()
+        elif line.startswith("data:"):
+            data.append(line[len("data:"):].strip())
+        elif not line and data:
+            yield event, json.loads("\n".join(data))
+            event, data = None, []
+
+
+class BenchmarkClient():
+    """One timed request per call; each method returns {"latency_ms", "ttft_ms"?, "first_audio_ms"?}."""
+
+    def __init__(self, base_url: str, stt_audio: bytes):
+        self.base_url = base_url
+        self.stt_audio = stt_audio
+        self.local = threading.local()
+
+    def __session(self) -> requests.Session:
+        if not hasattr(self.local, "session"):
+            self.local.session = requests.Session()
+            # One conversation per client thread, like one browser tab
+            self.local.session.headers["X-Session-ID"] = f"bench-{threading.get_ident()}"
+        return self.local.session
+
+    def __stream(self, path: str, question: str) -> Dict[str, float]:
+        started = time.perf_counter()
+        timings = {}
+        with self.__session().post(f"{self.base_url}{path}", json={"question": question}, stream=True, timeout=300) as response:
+            response.raise_for_status()
+            for event, payload in read_sse(response):
+                elapsed = (time.perf_counter() - started) * 1000
+                if event is None and "token" in payload:
+                    timings.setdefault("ttft_ms", elapsed)
+                elif event == "audio":
+                    timings.setdefault("first_audio_ms", elapsed)
+                elif event == "error":
+                    raise RuntimeError(payload.get("error"))
+        timings["latency_ms"] = (time.perf_counter() - started) * 1000
+        return timings
+
+    def chat(self, question: str) -> Dict[str, float]:
+        started = time.perf_counter()
+        response = self.__session().post(f"{self.base_url}/chat", json={"question": question}, timeout=300)
+        response.raise_for_status()
+        return {"latency_ms": (time.perf_counter() - started) * 1000}
+
+    def chat_stream(self, question: str) -> Dict[str, float]:
+        return self.__stream("/chat/stream", question)
+
+    def chat_with_speech(self, question: str) -> Dict[str, float]:
+        return self.__stream("/chat_with_speech", question)
+
+    def speech_tts(self, question: str) -> Dict[str, float]:
+        started = time.perf_counter()
+        response = self.__session().post(f"{self.base_url}/speech/tts", json={"text": question}, timeout=300)
+        response.raise_for_status()
+        return {"latency_ms": (time.perf_counter() - started) * 1000}
+
+    def speech_stt(self, question: str) -> Dict[str, float]:
+        started = time.perf_counter()
+        response = self.__session().post(f"{self.base_url}/speech/stt", timeout=300,
+                                         files={"audio": ("question.wav", self.stt_audio, "audio/wav")},
+                                         data={"language": "en"})
+        response.raise_for_status()
+        return {"latency_ms": (time.perf_counter() - started) * 1000}
+
+
+def run_scenario(call: Callable[[str], Dict[str, float]], questions: List[str],
+                 concurrency: int, n_requests: int) -> Dict[str, Any]:
+    samples, errors = [], []
+    lock = threading.Lock()
+    counter = iter(range(n_requests))
+
+    def worker():
+        while True:
+            with lock:
+                index = next(counter, None)
+            if index is None:
+                return
+            try:
+                result = call(questions[index % len(questions)])
+                with lock:
+                    samples.append(result)
+            except Exception as e:
+                with lock:
+                    errors.append(str(e))
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for _ in range(concurrency):
+            executor.submit(worker)
+    wall = time.perf_counter() - started
+
+    summary = {"concurrency": concurrency, "requests": len(samples), "errors": len(errors),
+               "throughput_rps": round(len(samples) / wall, 2) if wall else None}
+    for metric in ("latency_ms", "ttft_ms", "first_audio_ms"):
+        values = [sample[metric] for sample in samples if metric in sample]
+        if values:
+            summary[metric] = {"p50": percentile(values, 50), "p95": percentile(values, 95),
+                               "p99": percentile(values, 99), "mean": round(float(np.mean(values)), 1)}
+    if errors:
+        summary["first_error"] = errors[0]
+    return summary
+
+
+def compare(results: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """Print metric deltas against a previous run; return the regressions beyond tolerance (e.g. 0.1 = 10%)."""
+    regressions = []
+    for key, current in results["scenarios"].items():
+        previous = baseline.get("scenarios", {}).get(key)
+        if previous is None:
+            continue
+        for metric in ("latency_ms", "ttft_ms", "first_audio_ms"):
+            for stat in ("p50", "p95", "p99"):
+                new, old = current.get(metric, {}).get(stat), previous.get(metric, {}).get(stat)
+                if not new or not old:
+                    continue
+                change = (new - old) / old
+                flag = " REGRESSION" if change > tolerance else ""
+                print(f"{key:<28}{metric + ' ' + stat:<22}{old:>10.1f} -> {new:>10.1f} ({change:+.1%}){flag}")
+                if flag:
+                    regressions.append(f"{key} {metric} {stat}")
+        old_rps, new_rps = previous.get("throughput_rps"), current.get("throughput_rps")
+        if old_rps and new_rps:
+            change = (new_rps - old_rps) / old_rps
+            flag = " REGRESSION" if change < -tolerance else ""
+            print(f"{key:<28}{'throughput_rps':<22}{old_rps:>10.2f} -> {new_rps:>10.2f} ({change:+.1%}){flag}")
+            if flag:
+                regressions.append(f"{key} throughput_rps")
+    return regressions
+
+
+def start_api(args, stub_url: str, state_dir: str):
+    """Import api.py against the fakes: local vector store, stub speech services, fake OpenAI clients."""
+    os.environ.update({
+        "RAG_VECTOR_STORE": "local",
+        "RAG_STATE_DIR": state_dir,
+        "RAG_DOCS_DIR": os.path.abspath(args.docs_dir),
+        "RAG_SESSION_STORE": "memory",
+        "RAG_SYNC_ON_START": "1",
+        "RAG_ANSWER_CACHE": "1" if args.answer_cache else "0",
+        "TTS_SERVICE_URL": stub_url,
+        "STT_SERVICE_URL": stub_url,
+    })
+    import model
+    model.OpenAIEmbeddings = partial(FakeEmbeddings, latency_ms=args.embedding_ms)
+    model.ChatOpenAI = partial(FakeChatModel, first_token_ms=args.first_token_ms, token_ms=args.token_ms)
+    import api
+    return api.app
+
+
+def main():
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--concurrency", default="1,8", help="Comma-separated client counts")
+    parser.add_argument("--requests", type=int, default=40, help="Requests per scenario and concurrency level")
+    parser.add_argument("--questions", nargs="*",
+                        default=[os.path.join(root, "docs", "prompt_response_pairs.json"),
+                                 os.path.join(root, "requests.jsonl")])
+    parser.add_argument("--docs-dir", default=os.path.join(root, "docs"))
+    parser.add_argument("--first-token-ms", type=float, default=400)
+    parser.add_argument("--token-ms", type=float, default=20)
+    parser.add_argument("--embedding-ms", type=float, default=50)
+    parser.add_argument("--tts-ms", type=float, default=150, help="TTS stub latency per request")
+    parser.add_argument("--tts-ms-per-char", type=float, default=1.0)
+    parser.add_argument("--stt-ms", type=float, default=300)
+    parser.add_argument("--answer-cache", action="store_true", help="Keep the semantic answer cache on")
+    parser.add_argument("--seed", type=int, default=0, help="Shuffle seed for the question order")
+    parser.add_argument("--output", default=None, help="Where to save results (JSON)")
+    parser.add_argument("--compare", default=None, help="Previous results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.1)
+    args = parser.parse_args()
+
+    questions = load_questions(args.questions)
+    random.Random(args.seed).shuffle(questions)
+    scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios {sorted(unknown)}; choose from {SCENARIOS}")
+    levels = [int(level) for level in args.concurrency.split(",")]
+
+    stub_app = create_stub_speech_app(args.tts_ms, args.tts_ms_per_char, args.stt_ms)
+    with tempfile.TemporaryDirectory() as state_dir, ServerThread(stub_app) as stub:
+        with ServerThread(start_api(args, stub.url, state_dir)) as api_server:
+            client = BenchmarkClient(api_server.url, silent_wav(3.0))
+            results = {
+                "timestamp": datetime.now(timezone.utc).isoformat(),
+                "config": {key: value for key, value in vars(args).items() if key not in ("output", "compare")},
+                "questions": len(questions),
+                "scenarios": {},
+            }
+            for scenario in scenarios:
+                for concurrency in levels:
+                    key = f"{scenario}@{concurrency}"
+                    summary = run_scenario(getattr(client, scenario), questions, concurrency, args.requests)
+                    results["scenarios"][key] = summary
+                    latency = summary.get("latency_ms", {})
+                    ttft = summary.get("ttft_ms", {})
+                    print(f"{key:<24} p50 {latency.get('p50')} ms  p95 {latency.get('p95')} ms  "
+                          f"p99 {latency.get('p99')} ms  {summary['throughput_rps']} req/s"
+                          + (f"  ttft p50 {ttft.get('p50')} ms" if ttft else "")
+                          + (f"  errors {summary['errors']}" if summary["errors"] else ""))
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results saved to {args.output}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print(f"{len(regressions)} metrics regressed by more than {args.tolerance:.0%}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+import time
+import random
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import openai
+
+from settings import env_int
+from tokens import count_tokens
+from vector_backends import flush, insert_embeddings
+
+# Errors worth retrying: throttling, transient network failures and 5xx responses
+RETRYABLE_ERRORS = (openai.RateLimitError, openai.APIConnectionError,
+                    openai.APITimeoutError, openai.InternalServerError)
+
+
+class BulkIngestor():
+    """
+    Embeds and inserts document chunks in bulk, bypassing the vector store's add_documents.
+
+    Chunks from consecutive files are packed into token-budgeted embedding batches, a
+    bounded number of embedding requests run concurrently (retried with exponential
+    backoff and jitter on 429s and transient errors), and vectors are inserted in
+    large batches while the next batches are still being embedded. The store is
+    flushed once, in finish().
+
+    add() and finish() return (source, primary keys) for every file whose chunks have
+    all been inserted, so the caller can record them in the ingestion manifest.
+    """
+
+    def __init__(self, vector_store,
+                 max_batch_tokens: Optional[int] = None,
+                 max_batch_size: Optional[int] = None,
+                 max_concurrency: Optional[int] = None,
+                 insert_batch_size: Optional[int] = None,
+                 max_retries: int = 6,
+                 model_name: str = "text-embedding-ada-002"):
+        # Unset arguments fall back to the RAG_EMBED_* / RAG_INSERT_* environment variables
+        if max_batch_tokens is None:
+            max_batch_tokens = env_int("RAG_EMBED_BATCH_TOKENS", 100000)
+        if max_batch_size is None:
+            max_batch_size = env_int("RAG_EMBED_BATCH_SIZE", 512)
+        if max_concurrency is None:
+            max_concurrency = env_int("RAG_EMBED_CONCURRENCY", 4)
+        if insert_batch_size is None:
+            insert_batch_size = env_int("RAG_INSERT_BATCH_SIZE", 1000)
+        if min(max_batch_tokens, max_batch_size, max_concurrency, insert_batch_size) < 1:
+            raise ValueError("embedding batch sizes, concurrency and insert batch size must be positive")
+        self.vector_store = vector_store
+        self.max_batch_tokens = max_batch_tokens
+        self.max_batch_size = max_batch_size
+        self.max_concurrency = max_concurrency
+        self.insert_batch_size = insert_batch_size
+        self.max_retries = max_retries
+        self.model_name = model_name
+        self.chunks = 0
+        self.tokens = 0
+        self.retries = 0
+        self.__started = time.monotonic()
+        self.__executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="embed")
+        # (source, document, tokens) waiting to be packed into an embedding request
+        self.__batch: List[Tuple] = []
+        self.__batch_tokens = 0
+        self.__inflight: "deque[Future]" = deque()
+        # (source, document, vector) waiting to be inserted
+        self.__rows: List[Tuple] = []
+        self.__remaining: Dict[str, int] = {}
+        self.__primary_keys: Dict[str, List] = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.__executor.shutdown(wait=True, cancel_futures=True)
+
+    # PRIVATE METHODS #
+    def __embed(self, items: List[Tuple]) -> Tuple[List[Tuple], List[List[float]]]:
+        texts = [document.page_content for _, document, _ in items]
+        for attempt in range(self.max_retries + 1):
+            try:
+                return items, self.vector_store.embedding_func.embed_documents(texts)
+            except RETRYABLE_ERRORS as e:
+                if attempt == self.max_retries:
+                    raise
+                self.retries += 1
+                delay = min(60.0, 2 ** attempt) + random.uniform(0, 1)
+                print(f"Embedding batch of {len(texts)} failed ({type(e).__name__}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+
+    def __dispatch(self) -> None:
+        if self.__batch:
+            self.__inflight.append(self.__executor.submit(self.__embed, self.__batch))
+            self.__batch, self.__batch_tokens = [], 0
+        # Backpressure: never queue more requests than can run at once
+        while len(self.__inflight) > self.max_concurrency:
+            self.__receive(self.__inflight.popleft())
+
+    def __receive(self, future: Future) -> None:
+        items, vectors = future.result()
+        self.__rows.extend((source, document, vector) for (source, document, _), vector in zip(items, vectors))
+        if len(self.__rows) >= self.insert_batch_size:
+            self.__insert()
+
+    def __insert(self) -> None:
+        rows, self.__rows = self.__rows, []
+        if not rows:
+            return
+        primary_keys = insert_embeddings(self.vector_store,
+                                         [document.page_content for _, document, _ in rows],
+                                         [vector for _, _, vector in rows],
+                                         [document.metadata for _, document, _ in rows],
+                                         batch_size=self.insert_batch_size)
+        for (source, _, _), primary_key in zip(rows, primary_keys):
+            self.__primary_keys[source].append(primary_key)
+            self.__remaining[source] -= 1
+
+        self.chunks += len(rows)
+        self.__report()
+
+    def __report(self) -> None:
+        elapsed = max(time.monotonic() - self.__started, 1e-6)
+        print(f"Inserted {self.chunks} chunks "
+              f"({self.chunks / elapsed:.1f} chunks/s, {self.tokens / elapsed:.0f} tokens/s)")
+
+    def __collect(self, block: bool) -> List[Tuple[str, List]]:
+        while self.__inflight and (block or self.__inflight[0].done()):
+            self.__receive(self.__inflight.popleft())
+        if block:
+            self.__insert()
+
+        completed = [source for source, remaining in self.__remaining.items() if remaining == 0]
+        for source in completed:
+            del self.__remaining[source]
+        return [(source, self.__primary_keys.pop(source)) for source in completed]
+
+    # PUBLIC METHODS #
+    def add(self, source: str, chunks: list) -> List[Tuple[str, List]]:
+        self.__remaining[source] = len(chunks)
+        self.__primary_keys[source] = []
+        for document in chunks:
+            n_tokens = count_tokens(document.page_content, self.model_name)
+            if self.__batch and (self.__batch_tokens + n_tokens > self.max_batch_tokens
+                                 or len(self.__batch) >= self.max_batch_size):
+                self.__dispatch()
+            self.__batch.append((source, document, n_tokens))
+            self.__batch_tokens += n_tokens
+            self.tokens += n_tokens
+        return self.__collect(block=False)
+
+    def finish(self) -> List[Tuple[str, List]]:
+        self.__dispatch()
+        completed = self.__collect(block=True)
+        if self.chunks:
+            flush(self.vector_store)
+        return completed
+
+    def stats(self) -> Dict[str, float]:
+        elapsed = max(time.monotonic() - self.__started, 1e-6)
+        return {
+            "chunks": self.chunks,
+            "tokens": self.tokens,
+            "retries": self.retries,
+            "seconds": round(elapsed, 2),
+            "chunks_per_second": round(self.chunks / elapsed, 1),
+            "tokens_per_second": round(self.tokens / elapsed, 1),
+        }
@@ -0,0 +1,74 @@
+import os
+import re
+from typing import List, Set
+
+from langchain_core.documents import Document
+
+from tokens import count_tokens, get_encoding
+
+WHITESPACE = re.compile(r"\s+")
+
+
+def shingles(text: str, size: int = 5) -> Set[str]:
+    words = text.lower().split()
+    if len(words) <= size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+class ContextAssembler():
+    """
+    Turns retrieved chunks into the {context} block of the prompt.
+
+    Chunks are kept in rank order as plain text under a short source tag ("[1] manual.pdf").
+    A chunk whose word 5-grams mostly (overlap_threshold) appear in an already kept chunk
+    is dropped as a duplicate, e.g. the overlapping windows of neighbouring splits or the
+    same passage ingested twice. Chunks are added until max_tokens is reached; the last one
+    that fits only partly is truncated.
+    """
+
+    def __init__(self, max_tokens: int = 1500, model_name: str = "gpt-3.5-turbo", overlap_threshold: float = 0.8):
+        self.max_tokens = max_tokens
+        self.model_name = model_name
+        self.overlap_threshold = overlap_threshold
+
+    # PRIVATE METHODS #
+    def __truncate(self, text: str, max_tokens: int) -> str:
+        encoding = get_encoding(self.model_name)
+        if encoding is None:
+            return text[:max_tokens * 4]
+        return encoding.decode(encoding.encode(text, disallowed_special=())[:max_tokens])
+
+    def __source_tag(self, document: Document) -> str:
+        source = document.metadata.get("source")
+        return os.path.basename(source) if source else "unknown source"
+
+    # PUBLIC METHODS #
+    def assemble(self, documents: List[Document]) -> str:
+        blocks = []
+        kept_shingles: List[Set[str]] = []
+        used_tokens = 0
+
+        for document in documents:
+            text = WHITESPACE.sub(" ", document.page_content).strip()
+            if not text:
+                continue
+            chunk_shingles = shingles(text)
+            if any(len(chunk_shingles & kept) >= self.overlap_threshold * min(len(chunk_shingles), len(kept))
+                   for kept in kept_shingles):
+                continue
+
+            block = f"[{len(blocks) + 1}] {self.__source_tag(document)}\n{text}"
+            n_tokens = count_tokens(block, self.model_name) + 1  # separator
+            remaining = self.max_tokens - used_tokens
+            if n_tokens > remaining:
+                # Worth keeping a partial chunk only if there's meaningful room left
+                if remaining >= 64:
+                    blocks.append(self.__truncate(block, remaining - 1))
+                break
+
+            blocks.append(block)
+            kept_shingles.append(chunk_shingles)
+            used_tokens += n_tokens
+
+        return "\n\n".join(blocks)
@@ -0,0 +1,137 @@
+import os
+import json
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+import multiprocessing
+from typing import Iterator, List, Optional, Tuple
+
+from langchain_core.documents import Document
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from langchain_community.document_loaders import UnstructuredFileLoader
+
+try:
+    from pypdf import PdfReader
+except ImportError:  # Fast path unavailable: every PDF goes through unstructured
+    PdfReader = None
+
+# A PDF whose text layer yields fewer characters per page than this is treated as
+# scanned/image-only and handed to unstructured instead
+MIN_PDF_CHARS_PER_PAGE = 20
+
+
+def split_documents(documents: List[Document]) -> List[Document]:
+    # Same splitter (and defaults) as BaseLoader.load_and_split
+    return RecursiveCharacterTextSplitter().split_documents(documents)
+
+
+def load_with_unstructured(path: str) -> List[Document]:
+    return UnstructuredFileLoader(path).load_and_split()
+
+
+def load_pdf(path: str) -> List[Document]:
+    """Read the PDF text layer with pypdf, falling back to unstructured for scanned or unreadable files."""
+    if PdfReader is None:
+        return load_with_unstructured(path)
+    try:
+        reader = PdfReader(path)
+        text = "\n\n".join((page.extract_text() or "").strip() for page in reader.pages).strip()
+    except Exception as e:
+        print(f"Fast PDF extraction failed for {path} ({e}), using unstructured")
+        return load_with_unstructured(path)
+
+    if len(text) < MIN_PDF_CHARS_PER_PAGE * max(len(reader.pages), 1):
+        return load_with_unstructured(path)
+    # Metadata stays {"source": ...}: the Milvus collection schema is built from the first insert
+    return split_documents([Document(page_content=text, metadata={"source": path})])
+
+
+def load_prompt_response_json(path: str) -> Optional[List[Document]]:
+    """One chunk per Q&A pair of a {category: [{prompt, response}, ...]} file; None for any other JSON."""
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if not isinstance(data, dict) or not all(isinstance(pairs, list) for pairs in data.values()):
+        return None
+
+    documents = []
+    for category, pairs in data.items():
+        for pair in pairs:
+            if not isinstance(pair, dict) or not pair.get("prompt") or not pair.get("response"):
+                continue
+            content = f"{category}\nQuestion: {pair['prompt']}\nAnswer: {pair['response']}"
+            documents.append(Document(page_content=content, metadata={"source": path}))
+    return documents or None
+
+
+def load_file(path: str) -> List[Document]:
+    """Load and chunk one source file with the loader that fits its format."""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".pdf":
+        return load_pdf(path)
+    if extension == ".json":
+        try:
+            documents = load_prompt_response_json(path)
+        except (OSError, ValueError) as e:
+            print(f"Structured JSON loading failed for {path} ({e}), using unstructured")
+            documents = None
+        if documents is not None:
+            return documents
+    return load_with_unstructured(path)
+
+
+def _load_file_task(path: str) -> Tuple[str, List[Document]]:
+    return path, load_file(path)
+
+
+class ParallelDocumentLoader():
+    """
+    Loads files in a process pool, yielding each file's chunks as soon as it is parsed.
+
+    PDF parsing is CPU-bound, so threads would be serialized by the GIL. Workers are
+    spawned rather than forked so they don't inherit the parent's open gRPC (Milvus) channels.
+    Spawned workers re-import the entry script, so it must keep its work under
+    `if __name__ == "__main__":`; if the pool dies anyway, the remaining files are loaded
+    in this process instead of being reported as failed.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None):
+        self.max_workers = max_workers or int(os.getenv("RAG_INGEST_WORKERS", os.cpu_count() or 1))
+
+    # PRIVATE METHODS #
+    def __load_serial(self, paths: List[str]) -> Iterator[Tuple[str, Optional[List[Document]], Optional[Exception]]]:
+        for path in paths:
+            try:
+                yield path, load_file(path), None
+            except Exception as e:
+                yield path, None, e
+
+    # PUBLIC METHODS #
+    def load(self, paths: List[str]) -> Iterator[Tuple[str, Optional[List[Document]], Optional[Exception]]]:
+        """Yield (path, chunks, error) in completion order; error is set and chunks None on failure."""
+        if not paths:
+            return
+        if self.max_workers <= 1 or len(paths) == 1:
+            yield from self.__load_serial(paths)
+            return
+
+        context = multiprocessing.get_context("spawn")
+        workers = min(self.max_workers, len(paths))
+        remaining = list(paths)
+        try:
+            with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+                futures = {executor.submit(_load_file_task, path): path for path in paths}
+                for future in as_completed(futures):
+                    path = futures[future]
+                    try:
+                        _, chunks = future.result()
+                    except BrokenProcessPool:
+                        raise
+                    except Exception as e:
+                        remaining.remove(path)
+                        yield path, None, e
+                        continue
+                    remaining.remove(path)
+                    yield path, chunks, None
+        except BrokenProcessPool as e:
+            print(f"Ingestion workers died ({e}); loading the remaining {len(remaining)} files in this process. "
+                  "Is the entry script missing an `if __name__ == \"__main__\":` guard?")
+            yield from self.__load_serial(remaining)
@@ -0,0 +1,116 @@
+import time
+import sqlite3
+import hashlib
+import threading
+from typing import List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from metrics import record_cache_lookups
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings wrapper backed by a local SQLite store of float32 blobs.
+
+    Entries are keyed by model name + sha256 of the text, so document chunks and
+    query strings share one cache. Once max_entries is exceeded the least recently
+    used vectors are evicted.
+    """
+
+    def __init__(self, underlying: Embeddings, db_path: str, max_entries: int = 50000):
+        self.underlying = underlying
+        self.namespace = getattr(underlying, "model", type(underlying).__name__)
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.__lock = threading.Lock()
+        self.__conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.__conn.execute("PRAGMA journal_mode=WAL")
+        self.__conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key TEXT PRIMARY KEY, vector BLOB NOT NULL, last_used REAL NOT NULL)"
+        )
+        self.__conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings(last_used)")
+        self.__conn.commit()
+
+    # PRIVATE METHODS #
+    def __key(self, text: str) -> str:
+        return f"{self.namespace}:{hashlib.sha256(text.encode('utf-8')).hexdigest()}"
+
+    def __lookup(self, keys: List[str]) -> dict:
+        found = {}
+        now = time.time()
+        with self.__lock:
+            # Chunked to stay under SQLite's host parameter limit
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self.__conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32).tolist()
+                if rows:
+                    self.__conn.execute(
+                        f"UPDATE embeddings SET last_used = ? WHERE key IN ({placeholders})", [now, *batch]
+                    )
+            self.__conn.commit()
+        return found
+
+    def __store(self, keys: List[str], vectors: List[List[float]]) -> None:
+        now = time.time()
+        rows = [(key, np.asarray(vector, dtype=np.float32).tobytes(), now) for key, vector in zip(keys, vectors)]
+        with self.__lock:
+            self.__conn.executemany("INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?)", rows)
+            self.__evict()
+            self.__conn.commit()
+
+    def __evict(self) -> None:
+        (count,) = self.__conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        overflow = count - self.max_entries
+        if overflow > 0:
+            self.__conn.execute(
+                "DELETE FROM embeddings WHERE key IN "
+                "(SELECT key FROM embeddings ORDER BY last_used ASC LIMIT ?)", (overflow,)
+            )
+
+    # PUBLIC METHODS #
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [self.__key(text) for text in texts]
+        cached = self.__lookup(list(set(keys)))
+
+        # Embed each missing text once, even if it appears several times in the batch
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in cached:
+                missing.setdefault(key, text)
+        self.hits += len(texts) - len(missing)
+        self.misses += len(missing)
+        record_cache_lookups("embedding", len(texts) - len(missing), len(missing))
+
+        if missing:
+            vectors = self.underlying.embed_documents(list(missing.values()))
+            self.__store(list(missing.keys()), vectors)
+            cached.update(zip(missing.keys(), vectors))
+
+        return [cached[key] for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        key = self.__key(text)
+        cached = self.__lookup([key])
+        if key in cached:
+            self.hits += 1
+            record_cache_lookups("embedding", 1, 0)
+            return cached[key]
+
+        self.misses += 1
+        record_cache_lookups("embedding", 0, 1)
+        vector = self.underlying.embed_query(text)
+        self.__store([key], [vector])
+        return vector
+
+    def hit_rate(self) -> Optional[float]:
+        total = self.hits + self.misses
+        return self.hits / total if total else None
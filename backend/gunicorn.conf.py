@@ -0,0 +1,47 @@
+"""
+Production server for backend/api.py
+
+    gunicorn -c backend/gunicorn.conf.py --chdir backend api:app
+
+Documents are synced into Milvus once, in the master process, before any worker
+forks; each worker then builds its own RAG instance without re-syncing. gthread
+workers let the blocking OpenAI, Milvus and speech-service calls of concurrent
+requests overlap, since socket I/O releases the GIL.
+"""
+import os
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:8000")
+workers = int(os.getenv("GUNICORN_WORKERS", "1"))
+threads = int(os.getenv("GUNICORN_THREADS", "16"))
+worker_class = "gthread"
+# LLM answers and /chat/stream responses can take a while
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+graceful_timeout = 30
+keepalive = 5
+accesslog = "-"
+
+
+def on_starting(server):
+    # Metrics files of a previous run would be summed into this one
+    multiproc_dir = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+    if multiproc_dir:
+        os.makedirs(multiproc_dir, exist_ok=True)
+        for name in os.listdir(multiproc_dir):
+            os.remove(os.path.join(multiproc_dir, name))
+
+    from pymilvus import connections
+    from model import sync_documents
+
+    sync_documents(os.getenv("RAG_DOCS_DIR", "/app/docs"), os.getenv("RAG_STATE_DIR", ".rag_state"))
+
+    # gRPC channels must not be inherited across fork; workers open their own
+    for alias, _ in connections.list_connections():
+        connections.disconnect(alias)
+    os.environ["RAG_SYNC_ON_START"] = "0"
+
+
+def child_exit(server, worker):
+    # Drop the exited worker's live gauges from the aggregated /metrics output
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
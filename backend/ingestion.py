@@ -0,0 +1,167 @@
+import os
+import json
+import hashlib
+from typing import Dict, List, Optional
+
+from bulk_ingest import BulkIngestor
+from document_loaders import ParallelDocumentLoader
+from lexical_index import LexicalIndex
+from vector_backends import count_chunks, delete_chunks, flush, inserts_are_durable
+
+MANIFEST_FILE = "ingestion_manifest.json"
+LEXICAL_INDEX_DIR = "lexical"
+
+
+class IngestionManifest():
+    """Persistent map of source file -> (mtime, content hash, chunk IDs in the vector store)."""
+
+    def __init__(self, state_dir: str):
+        os.makedirs(state_dir, exist_ok=True)
+        self.path = os.path.join(state_dir, MANIFEST_FILE)
+        self.entries: Dict[str, Dict] = self.__load()
+
+    # PRIVATE METHODS #
+    def __load(self) -> Dict[str, Dict]:
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f).get("files", {})
+        except (OSError, ValueError):
+            print(f"Ingestion manifest at {self.path} is unreadable, starting from scratch")
+            return {}
+
+    # PUBLIC METHODS #
+    def get(self, source: str) -> Optional[Dict]:
+        return self.entries.get(source)
+
+    def set(self, source: str, mtime: float, sha256: str, chunk_ids: List) -> None:
+        self.entries[source] = {"mtime": mtime, "sha256": sha256, "chunk_ids": list(chunk_ids)}
+
+    def remove(self, source: str) -> List:
+        return self.entries.pop(source, {}).get("chunk_ids", [])
+
+    def sources(self) -> List[str]:
+        return list(self.entries.keys())
+
+    def clear(self) -> None:
+        self.entries = {}
+
+    def save(self) -> None:
+        # Write to a temp file and rename so a crash never leaves a half-written manifest
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"files": self.entries}, f)
+        os.replace(tmp_path, self.path)
+
+
+def file_sha256(path: str, block_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def list_source_files(docs_dir: str) -> List[str]:
+    # Same selection as DirectoryLoader's default "**/[!.]*" glob
+    paths = []
+    for root, dirs, files in os.walk(docs_dir):
+        dirs[:] = sorted(d for d in dirs if not d.startswith("."))
+        for name in sorted(files):
+            if not name.startswith("."):
+                paths.append(os.path.join(root, name))
+    return paths
+
+
+class DocumentIngestor():
+    """
+    Keeps the vector store in sync with a docs directory, embedding only new or changed files.
+
+    Changed files are parsed in parallel worker processes; each file's chunks go to the
+    BulkIngestor as soon as that file is parsed, while the rest keep loading. The BM25
+    index under state_dir/lexical is kept in step, keyed by the same chunk IDs.
+    """
+
+    def __init__(self, docs_dir: str, state_dir: str, max_workers: Optional[int] = None):
+        self.docs_dir = docs_dir
+        self.manifest = IngestionManifest(state_dir)
+        self.lexical_index = LexicalIndex(os.path.join(state_dir, LEXICAL_INDEX_DIR))
+        self.loader = ParallelDocumentLoader(max_workers)
+
+    # PUBLIC METHODS #
+    def sync(self, vector_store) -> Dict[str, int]:
+        # A fresh (or wiped) collection invalidates whatever the manifest remembers
+        if count_chunks(vector_store) == 0:
+            self.manifest.clear()
+            self.lexical_index.clear()
+
+        stats = {"added": 0, "updated": 0, "removed": 0, "unchanged": 0, "chunks": 0}
+        current_files = list_source_files(self.docs_dir)
+
+        deleted = False
+        for source in set(self.manifest.sources()) - set(current_files):
+            chunk_ids = self.manifest.remove(source)
+            delete_chunks(vector_store, chunk_ids)
+            self.lexical_index.remove(chunk_ids)
+            stats["removed"] += 1
+            deleted = True
+
+        pending = {}
+        for path in current_files:
+            mtime = os.path.getmtime(path)
+            entry = self.manifest.get(path)
+            # Files missing from the lexical index (e.g. ingested before it existed) are re-ingested;
+            # their embeddings come from the cache
+            if entry and not self.lexical_index.contains(entry["chunk_ids"]):
+                pending[path] = (mtime, file_sha256(path), entry)
+                continue
+            if entry and entry["mtime"] == mtime:
+                stats["unchanged"] += 1
+                continue
+
+            sha256 = file_sha256(path)
+            if entry and entry["sha256"] == sha256:
+                # Touched but not modified: just remember the new mtime
+                self.manifest.set(path, mtime, sha256, entry["chunk_ids"])
+                stats["unchanged"] += 1
+                continue
+
+            pending[path] = (mtime, sha256, entry)
+
+        if pending:
+            print(f"Ingesting {len(pending)} files with up to {self.loader.max_workers} workers...")
+        loaded = {}
+        with BulkIngestor(vector_store) as bulk:
+            def record(completed):
+                for path, chunk_ids in completed:
+                    mtime, sha256, entry = pending[path]
+                    self.manifest.set(path, mtime, sha256, chunk_ids)
+                    self.lexical_index.add(chunk_ids, loaded.pop(path))
+                    stats["updated" if entry else "added"] += 1
+                    stats["chunks"] += len(chunk_ids)
+                if completed and inserts_are_durable(vector_store):
+                    # Persist as files land so an interrupted boot doesn't redo finished work
+                    self.manifest.save()
+
+            for path, chunks, error in self.loader.load(list(pending)):
+                if error is not None:
+                    print(f"Failed to load {path}: {error}")
+                    continue
+                print(f"Ingesting {path} ({len(chunks)} chunks)...")
+                entry = pending[path][2]
+                if entry:
+                    delete_chunks(vector_store, entry["chunk_ids"])
+                    self.lexical_index.remove(entry["chunk_ids"])
+                    deleted = True
+                loaded[path] = chunks
+                record(bulk.add(path, chunks))
+            record(bulk.finish())
+            if bulk.chunks:
+                print(f"Bulk ingest: {bulk.stats()}")
+            elif deleted:
+                flush(vector_store)
+
+        self.manifest.save()
+        self.lexical_index.save()
+        return stats
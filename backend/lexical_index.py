@@ -0,0 +1,179 @@
+import os
+import re
+import json
+import math
+import threading
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+
+POSTINGS_FILE = "postings.npz"
+DOCUMENTS_FILE = "documents.json"
+
+# Words, numbers and restaurant shorthand such as "86'd" or "a/v"
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:['/][a-z0-9]+)*")
+STOPWORDS = frozenset(
+    "a an and are as at be but by can do does for from has have how i if in into is it its me my no not of on or "
+    "our should so than that the their them then there these they this to was we what when where which who why "
+    "will with you your".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    text = text.lower().replace("’", "'")
+    return [token for token in TOKEN_PATTERN.findall(text) if token not in STOPWORDS]
+
+
+class LexicalIndex():
+    """
+    BM25 over the ingested chunks, kept next to the ingestion state.
+
+    Postings are stored CSR-style in flat NumPy arrays: term t's documents are
+    doc_ids[offsets[t]:offsets[t + 1]], with term frequencies alongside. Chunks are added
+    and removed by their vector-store ID while syncing; save() rebuilds the arrays and
+    persists them. Scoring a query touches only the postings of its terms.
+    """
+
+    def __init__(self, directory: str, k1: float = 1.5, b: float = 0.75):
+        self.directory = directory
+        self.k1 = k1
+        self.b = b
+        self.__lock = threading.RLock()
+        # chunk ID -> (text, metadata); the source of truth the arrays are rebuilt from
+        self.__chunks: Dict[str, Tuple[str, Dict]] = {}
+        self.__ids: List[str] = []
+        self.__vocabulary: Dict[str, int] = {}
+        self.__offsets = np.zeros(1, dtype=np.int64)
+        self.__doc_ids = np.zeros(0, dtype=np.int32)
+        self.__freqs = np.zeros(0, dtype=np.int32)
+        self.__doc_lengths = np.zeros(0, dtype=np.int32)
+        self.__dirty = not self.__load()
+
+    # PRIVATE METHODS #
+    def __load(self) -> bool:
+        postings_path = os.path.join(self.directory, POSTINGS_FILE)
+        documents_path = os.path.join(self.directory, DOCUMENTS_FILE)
+        if not (os.path.exists(postings_path) and os.path.exists(documents_path)):
+            return False
+        try:
+            with open(documents_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            arrays = np.load(postings_path)
+        except (OSError, ValueError) as e:
+            print(f"Lexical index at {self.directory} is unreadable ({e}), starting from scratch")
+            return False
+        self.__ids = data["ids"]
+        self.__chunks = {chunk_id: (text, metadata)
+                         for chunk_id, text, metadata in zip(data["ids"], data["texts"], data["metadatas"])}
+        self.__vocabulary = {term: term_id for term_id, term in enumerate(data["vocabulary"])}
+        self.__offsets = arrays["offsets"]
+        self.__doc_ids = arrays["doc_ids"]
+        self.__freqs = arrays["freqs"]
+        self.__doc_lengths = arrays["doc_lengths"]
+        return True
+
+    def __build(self) -> None:
+        ids = list(self.__chunks.keys())
+        postings: Dict[str, List[Tuple[int, int]]] = {}
+        doc_lengths = np.zeros(len(ids), dtype=np.int32)
+        for doc_id, chunk_id in enumerate(ids):
+            terms = Counter(tokenize(self.__chunks[chunk_id][0]))
+            doc_lengths[doc_id] = sum(terms.values())
+            for term, freq in terms.items():
+                postings.setdefault(term, []).append((doc_id, freq))
+
+        vocabulary = sorted(postings)
+        offsets = np.zeros(len(vocabulary) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(postings[term]) for term in vocabulary])
+        pairs = np.asarray([pair for term in vocabulary for pair in postings[term]], dtype=np.int32).reshape(-1, 2)
+
+        self.__ids = ids
+        self.__vocabulary = {term: term_id for term_id, term in enumerate(vocabulary)}
+        self.__offsets = offsets
+        self.__doc_ids = pairs[:, 0].copy()
+        self.__freqs = pairs[:, 1].copy()
+        self.__doc_lengths = doc_lengths
+
+    # PUBLIC METHODS #
+    def __len__(self) -> int:
+        return len(self.__ids)
+
+    def contains(self, chunk_ids: Iterable) -> bool:
+        return all(str(chunk_id) in self.__chunks for chunk_id in chunk_ids)
+
+    def add(self, chunk_ids: List, documents: List[Document]) -> None:
+        with self.__lock:
+            for chunk_id, document in zip(chunk_ids, documents):
+                self.__chunks[str(chunk_id)] = (document.page_content, document.metadata)
+            self.__dirty = True
+
+    def remove(self, chunk_ids: List) -> None:
+        with self.__lock:
+            for chunk_id in chunk_ids:
+                self.__chunks.pop(str(chunk_id), None)
+            self.__dirty = True
+
+    def clear(self) -> None:
+        with self.__lock:
+            self.__chunks = {}
+            self.__dirty = True
+
+    def save(self) -> None:
+        """Rebuild the postings arrays from the current chunks and persist them atomically."""
+        with self.__lock:
+            if not self.__dirty:
+                return
+            self.__build()
+            os.makedirs(self.directory, exist_ok=True)
+            postings_path = os.path.join(self.directory, POSTINGS_FILE)
+            documents_path = os.path.join(self.directory, DOCUMENTS_FILE)
+            with open(f"{postings_path}.tmp", "wb") as f:
+                np.savez(f, offsets=self.__offsets, doc_ids=self.__doc_ids,
+                         freqs=self.__freqs, doc_lengths=self.__doc_lengths)
+            with open(f"{documents_path}.tmp", "w", encoding="utf-8") as f:
+                json.dump({
+                    "ids": self.__ids,
+                    "texts": [self.__chunks[chunk_id][0] for chunk_id in self.__ids],
+                    "metadatas": [self.__chunks[chunk_id][1] for chunk_id in self.__ids],
+                    "vocabulary": sorted(self.__vocabulary, key=self.__vocabulary.get),
+                }, f)
+            os.replace(f"{postings_path}.tmp", postings_path)
+            os.replace(f"{documents_path}.tmp", documents_path)
+            self.__dirty = False
+
+    def search(self, query: str, k: int = 4) -> List[Tuple[Document, float]]:
+        with self.__lock:
+            ids, offsets, doc_ids, freqs, doc_lengths = (self.__ids, self.__offsets, self.__doc_ids,
+                                                         self.__freqs, self.__doc_lengths)
+            term_ids = [self.__vocabulary[term] for term in set(tokenize(query)) if term in self.__vocabulary]
+        if not ids or not term_ids:
+            return []
+
+        n_docs = len(ids)
+        length_norm = self.k1 * (1 - self.b + self.b * doc_lengths / max(float(doc_lengths.mean()), 1.0))
+        scores = np.zeros(n_docs, dtype=np.float32)
+        for term_id in term_ids:
+            start, end = offsets[term_id], offsets[term_id + 1]
+            postings, tf = doc_ids[start:end], freqs[start:end]
+            idf = math.log(1 + (n_docs - (end - start) + 0.5) / ((end - start) + 0.5))
+            scores[postings] += idf * tf * (self.k1 + 1) / (tf + length_norm[postings])
+
+        matched = np.flatnonzero(scores)
+        top = matched[np.argsort(-scores[matched])[:k]]
+        return [(Document(page_content=self.__chunks[ids[i]][0], metadata=dict(self.__chunks[ids[i]][1])),
+                 float(scores[i])) for i in top]
+
+
+def reciprocal_rank_fusion(rankings: List[List[Document]], k: int = 60, limit: Optional[int] = None) -> List[Document]:
+    """Merge ranked lists by sum of 1 / (k + rank); identical chunk texts count as one document."""
+    scores: Dict[str, float] = {}
+    documents: Dict[str, Document] = {}
+    for ranking in rankings:
+        for rank, document in enumerate(ranking, start=1):
+            key = document.page_content
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank)
+            documents.setdefault(key, document)
+    ranked = sorted(scores, key=scores.get, reverse=True)
+    return [documents[key] for key in ranked[:limit]]
@@ -0,0 +1,160 @@
+import os
+import json
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+VECTORS_FILE = "vectors.npy"
+DOCUMENTS_FILE = "documents.json"
+
+
+class LocalVectorStore(VectorStore):
+    """
+    In-process vector index: a matrix of L2-normalized float32 vectors searched by matrix multiply.
+
+    Vectors are persisted to <directory>/vectors.npy and memory-mapped on load, so several
+    gunicorn workers share one copy through the page cache. Texts, metadata and IDs live in
+    documents.json. Scores are cosine similarities (higher is closer). Writes are kept in
+    memory until flush().
+    """
+
+    def __init__(self, embedding_function: Embeddings, directory: str):
+        self.embedding_func = embedding_function
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.__lock = threading.RLock()
+        self.__vectors: Optional[np.ndarray] = None
+        self.__ids: List[int] = []
+        self.__texts: List[str] = []
+        self.__metadatas: List[Dict] = []
+        self.__next_id = 0
+        self.__load()
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self.embedding_func
+
+    # PRIVATE METHODS #
+    def __load(self) -> None:
+        vectors_path = os.path.join(self.directory, VECTORS_FILE)
+        documents_path = os.path.join(self.directory, DOCUMENTS_FILE)
+        if not (os.path.exists(vectors_path) and os.path.exists(documents_path)):
+            return
+        with open(documents_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        vectors = np.load(vectors_path, mmap_mode="r")
+        # An emptied store is saved as a (0, 0) matrix; treat it like a fresh one so the next add sets the width
+        self.__vectors = vectors if len(vectors) else None
+        self.__ids = data["ids"]
+        self.__texts = data["texts"]
+        self.__metadatas = data["metadatas"]
+        self.__next_id = data["next_id"]
+
+    def __normalize(self, vectors) -> np.ndarray:
+        matrix = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+
+    def __matches(self, metadata: Dict, filter: Optional[Dict]) -> bool:
+        return not filter or all(metadata.get(key) == value for key, value in filter.items())
+
+    # PUBLIC METHODS #
+    def count(self) -> int:
+        return len(self.__ids)
+
+    def add_embeddings(self, texts: List[str], embeddings: List[List[float]],
+                       metadatas: Optional[List[Dict]] = None) -> List[int]:
+        metadatas = metadatas or [{} for _ in texts]
+        vectors = self.__normalize(embeddings)
+        with self.__lock:
+            ids = list(range(self.__next_id, self.__next_id + len(texts)))
+            self.__next_id += len(texts)
+            self.__vectors = vectors if self.__vectors is None else np.concatenate([self.__vectors, vectors])
+            self.__ids.extend(ids)
+            self.__texts.extend(texts)
+            self.__metadatas.extend(metadatas)
+        return ids
+
+    def add_texts(self, texts: Iterable[str], metadatas: Optional[List[Dict]] = None, **kwargs: Any) -> List[int]:
+        texts = list(texts)
+        ids = self.add_embeddings(texts, self.embedding_func.embed_documents(texts), metadatas)
+        self.flush()
+        return ids
+
+    def delete(self, ids: Optional[List[int]] = None, **kwargs: Any) -> Optional[bool]:
+        if not ids:
+            return False
+        doomed = set(ids)
+        with self.__lock:
+            keep = [row for row, chunk_id in enumerate(self.__ids) if chunk_id not in doomed]
+            if len(keep) == len(self.__ids):
+                return False
+            self.__vectors = np.asarray(self.__vectors[keep]) if keep else None
+            self.__ids = [self.__ids[row] for row in keep]
+            self.__texts = [self.__texts[row] for row in keep]
+            self.__metadatas = [self.__metadatas[row] for row in keep]
+        return True
+
+    def flush(self) -> None:
+        """Persist vectors and documents (atomically) and reopen the vectors memory-mapped."""
+        with self.__lock:
+            vectors_path = os.path.join(self.directory, VECTORS_FILE)
+            documents_path = os.path.join(self.directory, DOCUMENTS_FILE)
+            vectors = self.__vectors if self.__vectors is not None else np.zeros((0, 0), dtype=np.float32)
+            with open(f"{vectors_path}.tmp", "wb") as f:
+                np.save(f, np.ascontiguousarray(vectors, dtype=np.float32))
+            with open(f"{documents_path}.tmp", "w", encoding="utf-8") as f:
+                json.dump({"ids": self.__ids, "texts": self.__texts,
+                           "metadatas": self.__metadatas, "next_id": self.__next_id}, f)
+            os.replace(f"{vectors_path}.tmp", vectors_path)
+            os.replace(f"{documents_path}.tmp", documents_path)
+            if self.__vectors is not None:
+                self.__vectors = np.load(vectors_path, mmap_mode="r")
+
+    def search_by_vectors(self, queries, k: int = 4, filter: Optional[Dict] = None) -> List[List[Tuple[Document, float]]]:
+        """Batched top-k: one matrix multiply for all queries."""
+        with self.__lock:
+            vectors, texts, metadatas = self.__vectors, self.__texts, self.__metadatas
+        if vectors is None or not len(texts):
+            return [[] for _ in np.atleast_2d(queries)]
+
+        scores = self.__normalize(queries) @ vectors.T
+        if filter:
+            allowed = np.fromiter((self.__matches(metadata, filter) for metadata in metadatas), dtype=bool)
+            scores[:, ~allowed] = -np.inf
+
+        k = min(k, scores.shape[1])
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        results = []
+        for row, candidates in zip(scores, top):
+            ranked = candidates[np.argsort(-row[candidates])]
+            results.append([(Document(page_content=texts[i], metadata=dict(metadatas[i])), float(row[i]))
+                            for i in ranked if np.isfinite(row[i])])
+        return results
+
+    def similarity_search_with_score(self, query: str, k: int = 4, filter: Optional[Dict] = None,
+                                     **kwargs: Any) -> List[Tuple[Document, float]]:
+        return self.search_by_vectors([self.embedding_func.embed_query(query)], k=k, filter=filter)[0]
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4, filter: Optional[Dict] = None,
+                                    **kwargs: Any) -> List[Document]:
+        return [document for document, _ in self.search_by_vectors([embedding], k=k, filter=filter)[0]]
+
+    def similarity_search(self, query: str, k: int = 4, filter: Optional[Dict] = None, **kwargs: Any) -> List[Document]:
+        return [document for document, _ in self.similarity_search_with_score(query, k=k, filter=filter)]
+
+    def _select_relevance_score_fn(self):
+        # Cosine similarity in [-1, 1] -> [0, 1]
+        return lambda score: (score + 1.0) / 2.0
+
+    @classmethod
+    def from_texts(cls, texts: List[str], embedding: Embeddings, metadatas: Optional[List[Dict]] = None,
+                   directory: str = ".rag_state/vectors", **kwargs: Any) -> "LocalVectorStore":
+        store = cls(embedding, directory)
+        store.add_texts(texts, metadatas)
+        return store
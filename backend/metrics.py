@@ -0,0 +1,59 @@
+"""
+Prometheus metrics for the RAG backend, served on /metrics.
+
+Under gunicorn, set PROMETHEUS_MULTIPROC_DIR to an empty directory so every worker's
+samples are aggregated (gunicorn.conf.py cleans up after exited workers).
+"""
+import os
+import time
+from contextlib import contextmanager
+
+from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram,
+                               generate_latest, multiprocess)
+
+STAGE_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+TOKEN_BUCKETS = (16, 64, 256, 512, 1024, 2048, 4096, 8192)
+
+STAGE_SECONDS = Histogram(
+    "rag_stage_seconds", "Time spent in each RAG pipeline or proxy stage", ["stage"], buckets=STAGE_BUCKETS)
+REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "HTTP request duration, until the last byte of the response",
+    ["endpoint", "method", "status"], buckets=STAGE_BUCKETS)
+REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight", "Requests currently being served", ["endpoint"], multiprocess_mode="livesum")
+TOKENS = Histogram(
+    "rag_request_tokens", "Tokens per request: prompt (context, history, question) and completion",
+    ["kind"], buckets=TOKEN_BUCKETS)
+CACHE_LOOKUPS = Counter(
+    "rag_cache_lookups_total", "Cache lookups by cache and result (hit or miss)", ["cache", "result"])
+RETRIEVAL_FALLBACKS = Counter(
+    "rag_retrieval_fallbacks_total",
+    "Retrievals that skipped a stage: BM25 alone (timeout, error), no answer cache (answer_cache_timeout) "
+    "or no reranking (rerank_timeout, rerank_error)",
+    ["reason"])
+
+
+@contextmanager
+def stage(name: str):
+    """Time the enclosed block into rag_stage_seconds{stage=name}."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.labels(stage=name).observe(time.perf_counter() - started)
+
+
+def record_cache_lookups(cache: str, hits: int, misses: int) -> None:
+    if hits:
+        CACHE_LOOKUPS.labels(cache=cache, result="hit").inc(hits)
+    if misses:
+        CACHE_LOOKUPS.labels(cache=cache, result="miss").inc(misses)
+
+
+def metrics_payload():
+    """(body, content type) of the Prometheus text exposition for this process, or all workers."""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
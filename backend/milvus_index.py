@@ -0,0 +1,221 @@
+"""
+Index and search-parameter configuration for the training_documents collection.
+
+Recall-vs-latency report against an exact (flat) baseline, run next to a live Milvus:
+
+    python milvus_index.py report --k 4 --index-types HNSW,IVF_FLAT,IVF_SQ8
+
+Rebuild the collection's index with the configured settings (no re-embedding):
+
+    python milvus_index.py rebuild
+"""
+import os
+import json
+import time
+import argparse
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from settings import env_json
+
+# index type -> (build params, search params)
+INDEX_DEFAULTS = {
+    "HNSW": ({"M": 16, "efConstruction": 200}, {"ef": 64}),
+    "IVF_FLAT": ({"nlist": 128}, {"nprobe": 16}),
+    "IVF_SQ8": ({"nlist": 128}, {"nprobe": 16}),
+    "FLAT": ({}, {}),
+}
+
+# Search settings swept by the report, per index type
+SEARCH_GRID = {
+    "HNSW": [{"ef": ef} for ef in (8, 16, 32, 64, 128, 256)],
+    "IVF_FLAT": [{"nprobe": nprobe} for nprobe in (1, 4, 8, 16, 32, 64)],
+    "IVF_SQ8": [{"nprobe": nprobe} for nprobe in (1, 4, 8, 16, 32, 64)],
+    "FLAT": [{}],
+}
+
+
+class MilvusIndexConfig():
+    """Index type, metric, build and search parameters, read from MILVUS_* environment variables by default."""
+
+    def __init__(self,
+                 index_type: Optional[str] = None,
+                 metric_type: Optional[str] = None,
+                 build_params: Optional[Dict] = None,
+                 search_params: Optional[Dict] = None):
+        index_type = (index_type or os.getenv("MILVUS_INDEX_TYPE", "HNSW")).upper()
+        metric_type = metric_type or os.getenv("MILVUS_METRIC_TYPE", "L2")
+        if build_params is None:
+            build_params = env_json("MILVUS_INDEX_PARAMS")
+        if search_params is None:
+            search_params = env_json("MILVUS_SEARCH_PARAMS")
+        if index_type not in INDEX_DEFAULTS:
+            raise ValueError(f"MILVUS_INDEX_TYPE must be one of {list(INDEX_DEFAULTS)}")
+        default_build, default_search = INDEX_DEFAULTS[index_type]
+        self.index_type = index_type
+        self.metric_type = metric_type.upper()
+        self.build_params = {**default_build, **(build_params or {})}
+        self.search_params = {**default_search, **(search_params or {})}
+
+    def index_params(self) -> Dict:
+        return {"index_type": self.index_type, "metric_type": self.metric_type, "params": self.build_params}
+
+    def search_params_for(self, index_type: str, metric_type: str) -> Dict:
+        """Search params for whichever index the collection actually has."""
+        if index_type == self.index_type:
+            params = self.search_params
+        else:
+            params = INDEX_DEFAULTS.get(index_type, ({}, {}))[1]
+        return {"metric_type": metric_type, "params": dict(params)}
+
+
+def current_index(vector_store) -> Optional[Dict]:
+    """{"index_type", "metric_type", "params"} of the vector field's index, or None."""
+    if vector_store.col is None:
+        return None
+    for index in vector_store.col.indexes:
+        if index.field_name == vector_store._vector_field:
+            params = dict(index.params)
+            if isinstance(params.get("params"), str):
+                params["params"] = json.loads(params["params"])
+            return params
+    return None
+
+
+def apply_search_params(vector_store, config: MilvusIndexConfig) -> None:
+    """
+    Point the store's search params at the index that exists.
+
+    An existing collection is reused as is, never rebuilt on startup; if its index differs
+    from the configured one, searches use parameters valid for the existing index until
+    `python milvus_index.py rebuild` is run.
+    """
+    index = current_index(vector_store)
+    if index is None:
+        # Collection not created yet: the configured index is built on first insert
+        vector_store.search_params = config.search_params_for(config.index_type, config.metric_type)
+        return
+    if index["index_type"] != config.index_type or index["metric_type"] != config.metric_type:
+        print(f"Milvus index is {index['index_type']}/{index['metric_type']}, configured "
+              f"{config.index_type}/{config.metric_type}; run `python milvus_index.py rebuild` to switch")
+    vector_store.search_params = config.search_params_for(index["index_type"], index["metric_type"])
+
+
+def rebuild_index(vector_store, config: MilvusIndexConfig) -> None:
+    """Drop and recreate the vector index in place, then load the collection again."""
+    col = vector_store.col
+    if col is None:
+        raise ValueError("Collection does not exist yet, nothing to index")
+    col.release()
+    for index in col.indexes:
+        if index.field_name == vector_store._vector_field:
+            index.drop()
+    col.create_index(vector_store._vector_field, index_params=config.index_params())
+    col.load()
+    vector_store.index_params = config.index_params()
+    vector_store.search_params = config.search_params_for(config.index_type, config.metric_type)
+
+
+def fetch_vectors(vector_store, batch_size: int = 1000) -> Tuple[np.ndarray, np.ndarray]:
+    """(primary keys, vectors) of every stored chunk, used as the exact-search baseline."""
+    iterator = vector_store.col.query_iterator(batch_size=batch_size, expr=f"{vector_store._primary_field} >= 0",
+                                               output_fields=[vector_store._primary_field, vector_store._vector_field])
+    primary_keys, vectors = [], []
+    while True:
+        rows = iterator.next()
+        if not rows:
+            break
+        for row in rows:
+            primary_keys.append(row[vector_store._primary_field])
+            vectors.append(row[vector_store._vector_field])
+    iterator.close()
+    return np.asarray(primary_keys), np.asarray(vectors, dtype=np.float32)
+
+
+def exact_neighbours(corpus: np.ndarray, queries: np.ndarray, k: int, metric_type: str) -> np.ndarray:
+    if metric_type == "L2":
+        scores = -((queries ** 2).sum(axis=1, keepdims=True) - 2 * queries @ corpus.T + (corpus ** 2).sum(axis=1))
+    else:
+        if metric_type == "COSINE":
+            corpus = corpus / np.maximum(np.linalg.norm(corpus, axis=1, keepdims=True), 1e-12)
+            queries = queries / np.maximum(np.linalg.norm(queries, axis=1, keepdims=True), 1e-12)
+        scores = queries @ corpus.T
+    return np.argsort(-scores, axis=1)[:, :k]
+
+
+def measure(vector_store, queries: np.ndarray, truth: List[set], k: int, search_params: Dict) -> Dict:
+    latencies, recalls = [], []
+    for query, expected in zip(queries, truth):
+        started = time.perf_counter()
+        hits = vector_store.col.search([query.tolist()], vector_store._vector_field, search_params, limit=k)[0]
+        latencies.append((time.perf_counter() - started) * 1000)
+        recalls.append(len(expected & {hit.id for hit in hits}) / len(expected))
+    return {
+        "params": search_params["params"],
+        "recall": round(float(np.mean(recalls)), 4),
+        "p50_ms": round(float(np.percentile(latencies, 50)), 2),
+        "p95_ms": round(float(np.percentile(latencies, 95)), 2),
+    }
+
+
+def recall_report(vector_store, queries: np.ndarray, k: int = 4,
+                  index_types: Optional[List[str]] = None) -> List[Dict]:
+    """
+    Recall@k and search latency for each index type and search setting, against exact search.
+
+    Index types other than the current one are built in turn; the index the collection
+    had before the report is rebuilt at the end, so run this off-peak.
+    """
+    config = MilvusIndexConfig()
+    index = current_index(vector_store) or config.index_params()
+    metric_type = index["metric_type"]
+    primary_keys, corpus = fetch_vectors(vector_store)
+    truth = [set(primary_keys[row].tolist()) for row in exact_neighbours(corpus, queries, k, metric_type)]
+
+    rows = []
+    built_type = index["index_type"]
+    for index_type in index_types or [built_type]:
+        if index_type != built_type:
+            rebuild_index(vector_store, MilvusIndexConfig(index_type=index_type, metric_type=metric_type))
+            built_type = index_type
+        for params in SEARCH_GRID[index_type]:
+            result = measure(vector_store, queries, truth, k, {"metric_type": metric_type, "params": params})
+            rows.append({"index_type": index_type, **result})
+    if built_type != index["index_type"]:
+        rebuild_index(vector_store, MilvusIndexConfig(index_type=index["index_type"], metric_type=metric_type,
+                                                      build_params=index["params"]))
+        apply_search_params(vector_store, config)
+    return rows
+
+
+def main():
+    from model import connect_vector_store, create_embeddings
+    from answer_cache import load_prompt_response_pairs
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["report", "rebuild"])
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--index-types", default="", help="Comma-separated, e.g. HNSW,IVF_FLAT,IVF_SQ8")
+    parser.add_argument("--queries", default=os.path.join(os.getenv("RAG_DOCS_DIR", "../docs"), "prompt_response_pairs.json"))
+    parser.add_argument("--max-queries", type=int, default=200)
+    args = parser.parse_args()
+
+    embeddings = create_embeddings(os.getenv("RAG_STATE_DIR", ".rag_state"))
+    vector_store = connect_vector_store(embeddings)
+    if args.command == "rebuild":
+        rebuild_index(vector_store, MilvusIndexConfig())
+        print(f"Rebuilt index: {current_index(vector_store)}")
+        return
+
+    questions = [prompt for prompt, _ in load_prompt_response_pairs(args.queries)][:args.max_queries]
+    queries = np.asarray(embeddings.embed_documents(questions), dtype=np.float32)
+    index_types = [name.strip().upper() for name in args.index_types.split(",") if name.strip()]
+    print(f"{'index':<10}{'params':<20}{'recall@' + str(args.k):>10}{'p50 ms':>10}{'p95 ms':>10}")
+    for row in recall_report(vector_store, queries, k=args.k, index_types=index_types or None):
+        print(f"{row['index_type']:<10}{json.dumps(row['params']):<20}{row['recall']:>10.3f}"
+              f"{row['p50_ms']:>10.2f}{row['p95_ms']:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,8 @@
 import os
+import re
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
+from typing import List, Optional
 from dotenv import load_dotenv
 load_dotenv()
 
@@ -6,12 +10,107 @@ from langchain.retrievers.self_query.base import SelfQueryRetriever
 from langchain.chains.query_constructor.base import AttributeInfo
 from langchain.prompts import ChatPromptTemplate
 from langchain.schema.output_parser import StrOutputParser
-from langchain.memory import ConversationTokenBufferMemory
 from langchain_core.prompts import MessagesPlaceholder
 from langchain_openai.embeddings import OpenAIEmbeddings
 from langchain_openai.chat_models import ChatOpenAI
-from langchain_community.document_loaders import DirectoryLoader
 from langchain_community.vectorstores import Milvus
+from ingestion import LEXICAL_INDEX_DIR, DocumentIngestor, IngestionManifest
+from embedding_cache import CachedEmbeddings
+from milvus_index import MilvusIndexConfig, apply_search_params
+from local_vector_store import LocalVectorStore
+from vector_backends import VECTOR_BACKENDS
+from session_memory import SessionMemoryStore, SQLiteSessionBackend
+from answer_cache import SemanticAnswerCache, load_prompt_response_pairs
+from lexical_index import LexicalIndex, reciprocal_rank_fusion
+from metrics import RETRIEVAL_FALLBACKS, STAGE_SECONDS, TOKENS, stage
+from context_assembler import ContextAssembler
+from reranker import CrossEncoderReranker
+from settings import env_flag, env_float
+from tokens import count_tokens
+
+RETRIEVAL_MODES = ("auto", "vector", "self_query")
+
+# Cheap signal that a question names a file, the only attribute self-query can filter on.
+# Only real filenames count: "lunch/dinner" or "file a complaint" must not pay for the self-query LLM call.
+METADATA_FILTER_PATTERN = re.compile(r"\b[\w-]+\.(pdf|json|txt|docx?|md)\b", re.IGNORECASE)
+
+def mentions_metadata_filter(question: str, source_names=()) -> bool:
+    """True if the question names a document file or one of source_names (ingested files, with or without extension)."""
+    if METADATA_FILTER_PATTERN.search(question) is not None:
+        return True
+    lowered = question.lower()
+    return any(re.search(rf"(?<![\w-]){re.escape(name.lower())}(?![\w-])", lowered) for name in source_names)
+
+def source_names(sources) -> set:
+    """File names and stems of ingested sources, e.g. {"ED246305.pdf", "ED246305"}."""
+    names = set()
+    for source in sources:
+        name = os.path.basename(source)
+        names.update((name, os.path.splitext(name)[0]))
+    return names
+
+def create_embeddings(state_dir: str, max_entries: int = 50000) -> CachedEmbeddings:
+    # Vectors for chunks and queries we have already paid for are served from disk
+    os.makedirs(state_dir, exist_ok=True)
+    return CachedEmbeddings(OpenAIEmbeddings(),
+                            db_path=os.path.join(state_dir, "embeddings.sqlite3"),
+                            max_entries=max_entries)
+
+def connect_vector_store(embeddings, index_config: MilvusIndexConfig = None) -> Milvus:
+    # Milvus Vector Store - connect to external Milvus container, reusing (and loading, once) the existing collection
+    index_config = index_config or MilvusIndexConfig()
+    vector_store = Milvus(
+        embedding_function=embeddings,
+        connection_args={"host": os.getenv("MILVUS_HOST", "localhost"), "port": os.getenv("MILVUS_PORT", "19530")},
+        collection_name="training_documents",
+        index_params=index_config.index_params(),
+        search_params=index_config.search_params_for(index_config.index_type, index_config.metric_type),
+    )
+    apply_search_params(vector_store, index_config)
+    return vector_store
+
+def create_vector_store(embeddings, state_dir: str, backend: Optional[str] = None):
+    backend = backend or os.getenv("RAG_VECTOR_STORE", "milvus")
+    # "local" keeps the index in-process (memory-mapped under state_dir), no Milvus/etcd/MinIO needed
+    if backend not in VECTOR_BACKENDS:
+        raise ValueError(f"vector store backend must be one of {VECTOR_BACKENDS}")
+    if backend == "local":
+        return LocalVectorStore(embeddings, os.path.join(state_dir, "vectors"))
+    return connect_vector_store(embeddings)
+
+def sync_documents(docs_dir: str, state_dir: str, vector_store=None, embedding_cache_size: int = 50000) -> dict:
+    """Embed new or changed files under docs_dir and delete the chunks of removed ones."""
+    if vector_store is None:
+        vector_store = create_vector_store(create_embeddings(state_dir, max_entries=embedding_cache_size), state_dir)
+    print("Syncing Documents...")
+    stats = DocumentIngestor(docs_dir, state_dir).sync(vector_store)
+    print(f"Documents synced: {stats}")
+    return stats
+
+class QueryEmbedding():
+    """
+    A question's query embedding, computed once on the search pool and shared by the answer
+    cache and vector search. Both wait on it against the same deadline, so a slow embeddings
+    API delays a question by at most the vector search timeout.
+    """
+
+    def __init__(self, future: Future, timeout: float):
+        self.future = future
+        self.deadline = time.monotonic() + timeout
+
+    # PUBLIC METHODS #
+    def remaining(self) -> float:
+        return max(0.0, self.deadline - time.monotonic())
+
+    def result(self) -> List[float]:
+        """The embedding; raises FuturesTimeoutError once the deadline has passed."""
+        return self.future.result(timeout=self.remaining())
+
+    def ready(self) -> Optional[List[float]]:
+        """The embedding if it has been computed successfully, else None; never blocks."""
+        if self.future.done() and not self.future.cancelled() and self.future.exception() is None:
+            return self.future.result()
+        return None
 
 class RAG():
     def __init__(self,
@@ -19,38 +118,97 @@ class RAG():
                  n_retrievals: int = 4,
                  chat_max_tokens: int = 3097,
                  model_name = "gpt-3.5-turbo",
-                 creativeness: float = 0.7):
+                 creativeness: float = 0.7,
+                 state_dir: Optional[str] = None,
+                 embedding_cache_size: int = 50000,
+                 retrieval_mode: str = "auto",
+                 max_sessions: int = 1000,
+                 session_ttl: float = 3600,
+                 session_store: Optional[str] = None,
+                 answer_cache_threshold: float = 0.95,
+                 answer_cache_size: int = 500,
+                 use_answer_cache: bool = True,
+                 sync_on_start: bool = True,
+                 vector_store: Optional[str] = None,
+                 context_max_tokens: int = 1500,
+                 hybrid_search: Optional[bool] = None,
+                 n_candidates: int = 20,
+                 rrf_k: int = 60,
+                 vector_search_timeout: Optional[float] = None,
+                 reranker_model: Optional[str] = None,
+                 rerank_candidates: int = 20,
+                 rerank_threshold: Optional[float] = None,
+                 rerank_timeout: Optional[float] = None):
+        if retrieval_mode not in RETRIEVAL_MODES:
+            raise ValueError(f"retrieval_mode must be one of {RETRIEVAL_MODES}")
+        # Arguments left as None come from the RAG_* environment variables, read here rather than at import
+        state_dir = state_dir or os.getenv("RAG_STATE_DIR", ".rag_state")
+        session_store = session_store or os.getenv("RAG_SESSION_STORE", "memory")
+        vector_store = vector_store or os.getenv("RAG_VECTOR_STORE", "milvus")
+        reranker_model = os.getenv("RAG_RERANKER", "") if reranker_model is None else reranker_model
+        if hybrid_search is None:
+            hybrid_search = env_flag("RAG_HYBRID_SEARCH", True)
+        if vector_search_timeout is None:
+            vector_search_timeout = env_float("RAG_VECTOR_SEARCH_TIMEOUT", 3)
+        if rerank_threshold is None:
+            rerank_threshold = env_float("RAG_RERANK_THRESHOLD", 0.05)
+        if rerank_timeout is None:
+            rerank_timeout = env_float("RAG_RERANK_TIMEOUT", 0.5)
+        if vector_search_timeout <= 0 or rerank_timeout <= 0:
+            raise ValueError("RAG_VECTOR_SEARCH_TIMEOUT and RAG_RERANK_TIMEOUT must be positive")
+        self.__retrieval_mode = retrieval_mode
+        self.__n_retrievals = n_retrievals
+        self.__model_name = model_name
         self.__model = self.__set_llm_model(model_name, creativeness)
-        self.__docs_list = self.__get_docs_list(docs_dir)
-        self.__retriever = self.__set_retriever(k=n_retrievals)
-        self.__chat_history = self.__set_chat_history(max_token_limit=chat_max_tokens)
+        self.__embeddings = self.__set_embeddings(state_dir, max_entries=embedding_cache_size)
+        self.__vector_store = self.__set_vector_store(docs_dir, state_dir, backend=vector_store, sync=sync_on_start)
+        self.__reranker = self.__set_reranker(reranker_model, top_n=n_retrievals,
+                                              threshold=rerank_threshold) if reranker_model else None
+        self.__rerank_timeout = rerank_timeout
+        # With a reranker, retrieval returns a wider candidate set and the reranker keeps the best n_retrievals
+        self.__retrieval_k = max(rerank_candidates, n_retrievals) if self.__reranker is not None else n_retrievals
+        self.__retriever = self.__set_retriever(k=self.__retrieval_k)
+        self.__source_names = source_names(IngestionManifest(state_dir).sources())
+        self.__hybrid_search = hybrid_search
+        self.__n_candidates = max(n_candidates, self.__retrieval_k)
+        self.__rrf_k = rrf_k
+        self.__vector_search_timeout = vector_search_timeout
+        self.__lexical_index = LexicalIndex(os.path.join(state_dir, LEXICAL_INDEX_DIR)) if hybrid_search else None
+        self.__search_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="retrieval")
+        self.__chat_history = self.__set_chat_history(model_name,
+                                                      max_token_limit=chat_max_tokens,
+                                                      max_sessions=max_sessions,
+                                                      ttl_seconds=session_ttl,
+                                                      store=session_store,
+                                                      state_dir=state_dir)
+        self.__answer_cache = self.__set_answer_cache(docs_dir,
+                                                      threshold=answer_cache_threshold,
+                                                      max_generated=answer_cache_size) if use_answer_cache else None
+        self.__context_assembler = ContextAssembler(max_tokens=context_max_tokens, model_name=model_name)
+        self.__chain = self.__set_chain()
 
 
     # PRIVATE METHODS #
     def __set_llm_model(self, model_name = "gpt-3.5-turbo", temperature: float = 0.7):
         return ChatOpenAI(model_name=model_name, temperature=temperature)
     
-    def __get_docs_list(self, docs_dir: str) -> list:
-        print("Loading Documents...")
-        loader = DirectoryLoader(docs_dir,
-                                 recursive=True,
-                                 show_progress=True,
-                                 use_multithreading=True,
-                                 max_concurrency=4)
-        docs_list = loader.load_and_split()
-       
-        return docs_list
-    
+    def __set_embeddings(self, state_dir: str, max_entries: int = 50000):
+        return create_embeddings(state_dir, max_entries=max_entries)
+
+    def __set_vector_store(self, docs_dir: str, state_dir: str, backend: str = "milvus", sync: bool = True):
+        vector_store = create_vector_store(self.__embeddings, state_dir, backend=backend)
+
+        # Only new or changed files are embedded; chunks of removed files are deleted.
+        # Multi-worker servers sync once in the master process and skip it here.
+        if sync:
+            sync_documents(docs_dir, state_dir, vector_store=vector_store)
+
+        return vector_store
+
     def __set_retriever(self, k: int = 4):
-        # Milvus Vector Store - connect to external Milvus container
-        embeddings = OpenAIEmbeddings()
-        # Remove milvus_server.start() since we're using external Milvus
-        vector_store = Milvus.from_documents(
-            self.__docs_list,
-            embedding=embeddings,
-            connection_args={"host": os.getenv("MILVUS_HOST", "localhost"), "port": os.getenv("MILVUS_PORT", "19530")},
-            collection_name="training_documents",
-        )
+        # LangChain has no self-query translator for the in-process store; it always uses vector search
+        if isinstance(self.__vector_store, LocalVectorStore):
+            return None
 
         # Self-Querying Retriever
         metadata_field_info = [
@@ -65,7 +223,7 @@ class RAG():
 
         _retriever = SelfQueryRetriever.from_llm(
             self.__model,
-            vector_store,
+            self.__vector_store,
             document_content_description,
             metadata_field_info,
             search_kwargs={"k": k}
@@ -73,12 +231,136 @@ class RAG():
 
         return _retriever
     
-    def __set_chat_history(self, max_token_limit: int = 3097):
-        return ConversationTokenBufferMemory(llm=self.__model, max_token_limit=max_token_limit, return_messages=True)
+    def __embed_query(self, question: str) -> QueryEmbedding:
+        def embed():
+            with stage("query_embedding"):
+                return self.__embeddings.embed_query(question)
+        return QueryEmbedding(self.__search_pool.submit(embed), self.__vector_search_timeout)
+
+    def __vector_search(self, embedding: List[float], k: int) -> list:
+        with stage("vector_search"):
+            return self.__vector_store.similarity_search_by_vector(embedding, k=k)
+
+    def __retrieve(self, question: str, query: Optional[QueryEmbedding] = None) -> list:
+        # The self-query step costs a full LLM round trip, so only pay it when a filter is likely
+        if self.__retriever is not None and (self.__retrieval_mode == "self_query" or (
+                self.__retrieval_mode == "auto" and mentions_metadata_filter(question, self.__source_names))):
+            with stage("self_query"):
+                return self.__retriever.get_relevant_documents(question)
+        query = query or self.__embed_query(question)
+        if self.__lexical_index is None or len(self.__lexical_index) == 0:
+            # Nothing to fall back to: wait for the embedding however long it takes
+            return self.__vector_search(query.future.result(), self.__retrieval_k)
+
+        # Hybrid: BM25 runs while the query is embedded and searched; the two rankings are merged
+        # with reciprocal rank fusion. If the vector side fails or misses the query's deadline,
+        # BM25 answers alone.
+        with stage("bm25_search"):
+            lexical_results = self.__lexical_index.search(question, k=self.__n_candidates)
+        lexical_documents = [document for document, _ in lexical_results]
+        try:
+            embedding = query.result()
+            vector_future = self.__search_pool.submit(self.__vector_search, embedding, self.__n_candidates)
+            vector_documents = vector_future.result(timeout=query.remaining())
+        except FuturesTimeoutError:
+            RETRIEVAL_FALLBACKS.labels(reason="timeout").inc()
+            print(f"Vector search took over {self.__vector_search_timeout}s, answering from the lexical index")
+            return lexical_documents[:self.__retrieval_k]
+        except Exception as e:
+            RETRIEVAL_FALLBACKS.labels(reason="error").inc()
+            print(f"Vector search failed ({type(e).__name__}: {e}), answering from the lexical index")
+            return lexical_documents[:self.__retrieval_k]
+        return reciprocal_rank_fusion([vector_documents, lexical_documents], k=self.__rrf_k, limit=self.__retrieval_k)
+
+    def __set_reranker(self, model_name: str, top_n: int = 4, threshold: float = 0.05):
+        reranker = CrossEncoderReranker(model_name, top_n=top_n, threshold=threshold)
+        reranker.warmup()
+        print(f"Reranker {model_name} loaded")
+        return reranker
+
+    def __rerank(self, question: str, documents: list) -> list:
+        if self.__reranker is None:
+            return documents
+        # Scoring runs on the search pool so an overloaded CPU can't stall the answer past the latency budget
+        future = self.__search_pool.submit(self.__reranker.rerank, question, documents)
+        try:
+            with stage("rerank"):
+                return future.result(timeout=self.__rerank_timeout)
+        except FuturesTimeoutError:
+            RETRIEVAL_FALLBACKS.labels(reason="rerank_timeout").inc()
+            print(f"Reranking took over {self.__rerank_timeout}s, keeping the retrieval order")
+        except Exception as e:
+            RETRIEVAL_FALLBACKS.labels(reason="rerank_error").inc()
+            print(f"Reranking failed ({type(e).__name__}: {e}), keeping the retrieval order")
+        return documents[:self.__n_retrievals]
+
+    def __set_chat_history(self, model_name: str, max_token_limit: int = 3097, max_sessions: int = 1000,
+                           ttl_seconds: float = 3600, store: str = "memory", state_dir: str = ".rag_state"):
+        # One bounded history per session instead of a single buffer shared by every user
+        backend = None
+        if store == "sqlite":
+            os.makedirs(state_dir, exist_ok=True)
+            backend = SQLiteSessionBackend(os.path.join(state_dir, "sessions.sqlite3"))
+        elif store != "memory":
+            raise ValueError("session_store must be 'memory' or 'sqlite'")
+        return SessionMemoryStore(model_name,
+                                  max_token_limit=max_token_limit,
+                                  max_sessions=max_sessions,
+                                  ttl_seconds=ttl_seconds,
+                                  backend=backend)
     
 
-    # PUBLIC METHODS #
-    def ask(self, question: str) -> str:
+    def __set_answer_cache(self, docs_dir: str, threshold: float = 0.95, max_generated: int = 500):
+        # Curated Q&A pairs answer the most common questions without retrieval or an LLM call
+        answer_cache = SemanticAnswerCache(self.__embeddings, threshold=threshold, max_generated=max_generated)
+        pairs_path = os.path.join(docs_dir, "prompt_response_pairs.json")
+        if os.path.exists(pairs_path):
+            pairs = load_prompt_response_pairs(pairs_path)
+            answer_cache.seed(pairs)
+            print(f"Answer cache seeded with {len(pairs)} curated pairs")
+        return answer_cache
+
+    def __is_first_turn(self, session_id: str) -> bool:
+        # Follow-ups ("why?", "give an example") mean different things in different conversations,
+        # so LLM-generated answers are only cached and reused for a session's opening question
+        if self.__answer_cache is None:
+            return False
+        with stage("history_load"):
+            return not self.__chat_history.load(session_id)
+
+    def __get_cached_answer(self, question: str, session_id: str, first_turn: bool,
+                           query: Optional[QueryEmbedding]):
+        if self.__answer_cache is None:
+            return None
+        try:
+            with stage("answer_cache"):
+                answer = self.__answer_cache.lookup(question, include_generated=first_turn, embedding=query.result())
+        except FuturesTimeoutError:
+            # The same embedding feeds vector search, which falls back to BM25 on the same deadline
+            RETRIEVAL_FALLBACKS.labels(reason="answer_cache_timeout").inc()
+            print(f"Question embedding took over {self.__vector_search_timeout}s, skipping the answer cache")
+            return None
+        except Exception as e:
+            # The lookup embeds the question; when the embedding API is down, carry on to the lexical retriever
+            print(f"Answer cache lookup failed ({type(e).__name__}: {e})")
+            return None
+        if answer is not None:
+            self.__chat_history.save(session_id, question, answer)
+        return answer
+
+    def __remember(self, question: str, answer: str, session_id: str, first_turn: bool,
+                   query: Optional[QueryEmbedding]) -> None:
+        self.__chat_history.save(session_id, question, answer)
+        # Only cache under an embedding that is already there: never block the reply on the embeddings API
+        embedding = query.ready() if query is not None else None
+        if self.__answer_cache is not None and first_turn and embedding is not None:
+            try:
+                self.__answer_cache.add(question, answer, embedding=embedding)
+            except Exception as e:
+                print(f"Could not add the answer to the cache ({type(e).__name__}: {e})")
+
+    def __set_chain(self):
+        # Built once: the prompt, parser and chain are the same for every question
         prompt_string = '''
 You are DUBULA, a restaurant service training assistant. Provide detailed, actionable advice to restaurant staff.
 
@@ -92,7 +374,7 @@ Response Guidelines:
 - Where applicable, mention both what to do and what to avoid
 - If the question can't be answered with the given context, state this clearly and provide general best practices instead
 
-Based on the context below, answer accordingly:
+Based on the context below (numbered excerpts, each tagged with its source document), answer accordingly:
 
 {context}
 '''
@@ -103,14 +385,71 @@ Based on the context below, answer accordingly:
         ])
        
         output_parser = StrOutputParser()
-        chain = prompt | self.__model | output_parser
-        answer = chain.invoke({
+        return prompt | self.__model | output_parser
+
+    def __get_inputs(self, question: str, session_id: str, query: Optional[QueryEmbedding]) -> dict:
+        with stage("history_load"):
+            chat_history = self.__chat_history.load(session_id)
+        documents = self.__rerank(question, self.__retrieve(question, query))
+        with stage("context_assembly"):
+            context = self.__context_assembler.assemble(documents)
+        TOKENS.labels(kind="prompt").observe(
+            count_tokens(question, self.__model_name)
+            + sum(count_tokens(str(message.content), self.__model_name) for message in chat_history)
+            + count_tokens(context, self.__model_name))
+        return {
             "input": question,
-            "chat_history": self.__chat_history.load_memory_variables({})['history'],
-            "context": self.__retriever.get_relevant_documents(question)
-        })
+            "chat_history": chat_history,
+            "context": context
+        }
+
+
+    # PUBLIC METHODS #
+    def ask(self, question: str, session_id: str = "default") -> str:
+        first_turn = self.__is_first_turn(session_id)
+        # Only embed up front when the answer cache needs it; otherwise retrieval embeds on demand
+        query = self.__embed_query(question) if self.__answer_cache is not None else None
+        cached_answer = self.__get_cached_answer(question, session_id, first_turn, query)
+        if cached_answer is not None:
+            return cached_answer
+
+        inputs = self.__get_inputs(question, session_id, query)
+        with stage("llm"):
+            answer = self.__chain.invoke(inputs)
+        TOKENS.labels(kind="completion").observe(count_tokens(answer, self.__model_name))
 
         # Atualização do histórico de conversa
-        self.__chat_history.save_context({"input": question}, {"output": answer})
+        self.__remember(question, answer, session_id, first_turn, query)
        
-        return answer
\ No newline at end of file
+        return answer
+
+    def ask_stream(self, question: str, session_id: str = "default"):
+        """Yield the answer token by token; the full answer goes into chat memory once the stream completes."""
+        first_turn = self.__is_first_turn(session_id)
+        # Only embed up front when the answer cache needs it; otherwise retrieval embeds on demand
+        query = self.__embed_query(question) if self.__answer_cache is not None else None
+        cached_answer = self.__get_cached_answer(question, session_id, first_turn, query)
+        if cached_answer is not None:
+            yield cached_answer
+            return
+
+        tokens = []
+        inputs = self.__get_inputs(question, session_id, query)
+        started = time.perf_counter()
+        for token in self.__chain.stream(inputs):
+            if not tokens:
+                STAGE_SECONDS.labels(stage="llm_first_token").observe(time.perf_counter() - started)
+            tokens.append(token)
+            yield token
+        STAGE_SECONDS.labels(stage="llm").observe(time.perf_counter() - started)
+
+        answer = "".join(tokens)
+        TOKENS.labels(kind="completion").observe(count_tokens(answer, self.__model_name))
+        self.__remember(question, answer, session_id, first_turn, query)
+
+    def get_cache_stats(self) -> dict:
+        return {
+            "answer_cache": self.__answer_cache.stats() if self.__answer_cache is not None else None,
+            "embedding_cache": {"hits": self.__embeddings.hits, "misses": self.__embeddings.misses},
+            "rerank_cache": self.__reranker.stats() if self.__reranker is not None else None,
+        }
\ No newline at end of file
@@ -0,0 +1,94 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import List, Optional
+
+from langchain_core.documents import Document
+
+from metrics import record_cache_lookups
+
+try:
+    from sentence_transformers import CrossEncoder
+except ImportError:  # Reranking is optional: sentence-transformers pulls in torch
+    CrossEncoder = None
+
+DEFAULT_RERANKER_MODEL = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+
+
+class CrossEncoderReranker():
+    """
+    Re-scores retrieved chunks against the question with a small cross-encoder on CPU.
+
+    Candidates are scored in batches of batch_size (query, chunk) pairs, truncated to
+    max_length tokens. Scores are kept in an in-memory LRU keyed by question + chunk text,
+    so repeated or popular questions skip inference. rerank() keeps the top_n chunks
+    whose score (a 0-1 relevance probability for the MS MARCO models) reaches threshold;
+    if none do, the single best chunk is kept so the prompt is never left without context.
+    """
+
+    def __init__(self,
+                 model_name: str = DEFAULT_RERANKER_MODEL,
+                 top_n: int = 4,
+                 threshold: float = 0.05,
+                 batch_size: int = 32,
+                 max_length: int = 256,
+                 cache_size: int = 20000):
+        if CrossEncoder is None:
+            raise ImportError("Reranking needs sentence-transformers: pip install sentence-transformers")
+        self.model_name = model_name
+        self.top_n = top_n
+        self.threshold = threshold
+        self.batch_size = batch_size
+        self.cache_size = cache_size
+        self.hits = 0
+        self.misses = 0
+        self.__model = CrossEncoder(model_name, max_length=max_length, device="cpu")
+        self.__cache: "OrderedDict[str, float]" = OrderedDict()
+        self.__lock = threading.Lock()
+
+    # PRIVATE METHODS #
+    def __key(self, query: str, text: str) -> str:
+        return hashlib.sha256(f"{query}\0{text}".encode("utf-8")).hexdigest()
+
+    # PUBLIC METHODS #
+    def warmup(self) -> None:
+        # The first predict() call pays for lazy initialisation; keep it off the first request
+        self.__model.predict([("warmup", "warmup")], show_progress_bar=False)
+
+    def score(self, query: str, texts: List[str]) -> List[float]:
+        keys = [self.__key(query, text) for text in texts]
+        scores: List[Optional[float]] = [None] * len(texts)
+        with self.__lock:
+            for i, key in enumerate(keys):
+                if key in self.__cache:
+                    self.__cache.move_to_end(key)
+                    scores[i] = self.__cache[key]
+
+        missing = [i for i, score in enumerate(scores) if score is None]
+        if missing:
+            predicted = self.__model.predict([(query, texts[i]) for i in missing],
+                                             batch_size=self.batch_size,
+                                             show_progress_bar=False)
+            with self.__lock:
+                for i, score in zip(missing, predicted):
+                    scores[i] = float(score)
+                    self.__cache[keys[i]] = scores[i]
+                while len(self.__cache) > self.cache_size:
+                    self.__cache.popitem(last=False)
+
+        hits = len(texts) - len(missing)
+        self.hits += hits
+        self.misses += len(missing)
+        record_cache_lookups("rerank", hits, len(missing))
+        return scores
+
+    def rerank(self, query: str, documents: List[Document]) -> List[Document]:
+        if not documents:
+            return []
+        scores = self.score(query, [document.page_content for document in documents])
+        ranked = sorted(zip(scores, range(len(documents))), reverse=True)
+        kept = [documents[i] for score, i in ranked[:self.top_n] if score >= self.threshold]
+        return kept or [documents[ranked[0][1]]]
+
+    def stats(self) -> dict:
+        return {"model": self.model_name, "hits": self.hits, "misses": self.misses, "entries": len(self.__cache)}
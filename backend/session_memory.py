@@ -0,0 +1,170 @@
+import json
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Callable, List, Optional, Tuple
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+
+from tokens import count_tokens
+
+# (role, content, n_tokens) - token counts are computed once, when a turn is saved
+Turn = Tuple[str, str, int]
+
+
+class SQLiteSessionBackend():
+    """Persists session histories so they survive worker restarts and are shared between workers."""
+
+    def __init__(self, db_path: str):
+        self.__lock = threading.Lock()
+        self.__conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+        self.__conn.execute("PRAGMA journal_mode=WAL")
+        self.__conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            "session_id TEXT PRIMARY KEY, turns TEXT NOT NULL, last_access REAL NOT NULL)"
+        )
+        self.__conn.commit()
+
+    def get(self, session_id: str) -> Optional[Tuple[List[Turn], float]]:
+        with self.__lock:
+            row = self.__conn.execute(
+                "SELECT turns, last_access FROM sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return [tuple(turn) for turn in json.loads(row[0])], row[1]
+
+    def put(self, session_id: str, turns: List[Turn], last_access: float) -> None:
+        with self.__lock:
+            self.__conn.execute(
+                "INSERT OR REPLACE INTO sessions VALUES (?, ?, ?)", (session_id, json.dumps(turns), last_access)
+            )
+            self.__conn.commit()
+
+    def append(self, session_id: str, new_turns: List[Turn], now: float, ttl_seconds: float,
+               trim: Callable[[List[Turn]], List[Turn]]) -> List[Turn]:
+        """Read, extend and write a history in one write transaction, so concurrent workers never drop turns."""
+        with self.__lock:
+            # BEGIN IMMEDIATE takes SQLite's write lock up front: a second worker waits instead of reading a stale copy
+            self.__conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self.__conn.execute(
+                    "SELECT turns, last_access FROM sessions WHERE session_id = ?", (session_id,)
+                ).fetchone()
+                turns = []
+                if row is not None and now - row[1] < ttl_seconds:
+                    turns = [tuple(turn) for turn in json.loads(row[0])]
+                turns = trim(turns + new_turns)
+                self.__conn.execute(
+                    "INSERT OR REPLACE INTO sessions VALUES (?, ?, ?)", (session_id, json.dumps(turns), now)
+                )
+                self.__conn.commit()
+            except BaseException:
+                self.__conn.rollback()
+                raise
+        return turns
+
+    def delete(self, session_id: str) -> None:
+        with self.__lock:
+            self.__conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+            self.__conn.commit()
+
+    def purge(self, older_than: float) -> None:
+        with self.__lock:
+            self.__conn.execute("DELETE FROM sessions WHERE last_access < ?", (older_than,))
+            self.__conn.commit()
+
+
+class SessionMemoryStore():
+    """
+    Conversation history per session ID, with an LRU cap on live sessions and idle TTL expiry.
+
+    Each history is trimmed from the oldest turn to max_token_limit, counted with a local
+    tiktoken encoder instead of asking the LLM wrapper to re-count the whole buffer.
+    With a backend, SQLite is the source of truth: histories are read from it on every
+    load and appended to it transactionally, so every worker sees the same conversation.
+    """
+
+    def __init__(self,
+                 model_name: str = "gpt-3.5-turbo",
+                 max_token_limit: int = 3097,
+                 max_sessions: int = 1000,
+                 ttl_seconds: float = 3600,
+                 backend: Optional[SQLiteSessionBackend] = None):
+        self.model_name = model_name
+        self.max_token_limit = max_token_limit
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self.backend = backend
+        self.__sessions: "OrderedDict[str, Tuple[List[Turn], float]]" = OrderedDict()
+        self.__lock = threading.Lock()
+        self.__last_purge = 0.0
+
+    # PRIVATE METHODS #
+    def __count_tokens(self, text: str) -> int:
+        return count_tokens(text, self.model_name)
+
+    def __expire(self, now: float) -> None:
+        # Sessions are kept in last-write order, so expired ones are all at the front
+        while self.__sessions:
+            session_id, (_, last_access) = next(iter(self.__sessions.items()))
+            if now - last_access < self.ttl_seconds:
+                break
+            self.__sessions.popitem(last=False)
+        # Persistent rows are swept at most once a minute to keep writes off the hot path
+        if self.backend is not None and now - self.__last_purge > 60:
+            self.backend.purge(now - self.ttl_seconds)
+            self.__last_purge = now
+
+    def __get_turns(self, session_id: str, now: float) -> List[Turn]:
+        if self.backend is not None:
+            # Another worker may have appended since we last saw this session
+            stored = self.backend.get(session_id)
+            if stored is not None and now - stored[1] < self.ttl_seconds:
+                return stored[0]
+            return []
+        if session_id in self.__sessions:
+            return self.__sessions[session_id][0]
+        return []
+
+    def __put_turns(self, session_id: str, turns: List[Turn], now: float) -> None:
+        self.__sessions[session_id] = (turns, now)
+        self.__sessions.move_to_end(session_id)
+        while len(self.__sessions) > self.max_sessions:
+            self.__sessions.popitem(last=False)
+
+    def __trim(self, turns: List[Turn]) -> List[Turn]:
+        total_tokens = sum(n_tokens for _, _, n_tokens in turns)
+        while turns and total_tokens > self.max_token_limit:
+            total_tokens -= turns.pop(0)[2]
+        return turns
+
+    # PUBLIC METHODS #
+    def load(self, session_id: str) -> List[BaseMessage]:
+        now = time.time()
+        with self.__lock:
+            self.__expire(now)
+            turns = list(self.__get_turns(session_id, now))
+        return [HumanMessage(content=content) if role == "human" else AIMessage(content=content)
+                for role, content, _ in turns]
+
+    def save(self, session_id: str, question: str, answer: str) -> None:
+        now = time.time()
+        new_turns = [("human", question, self.__count_tokens(question)),
+                     ("ai", answer, self.__count_tokens(answer))]
+        if self.backend is not None:
+            self.backend.append(session_id, new_turns, now, self.ttl_seconds, self.__trim)
+            return
+        with self.__lock:
+            turns = self.__trim(list(self.__get_turns(session_id, now)) + new_turns)
+            self.__put_turns(session_id, turns, now)
+
+    def clear(self, session_id: str) -> None:
+        with self.__lock:
+            self.__sessions.pop(session_id, None)
+            if self.backend is not None:
+                self.backend.delete(session_id)
+
+    def __len__(self) -> int:
+        return len(self.__sessions)
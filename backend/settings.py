@@ -0,0 +1,44 @@
+import os
+import json
+from typing import Dict, Optional
+
+# Settings are read when the object using them is built, not at import, so a malformed
+# value fails that constructor with a clear message instead of breaking `import model`.
+
+
+def env_flag(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    return default if value is None or value == "" else value == "1"
+
+
+def env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    if value is None or value == "":
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f"{name} must be an integer, got {value!r}") from None
+
+
+def env_float(name: str, default: float) -> float:
+    value = os.getenv(name)
+    if value is None or value == "":
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        raise ValueError(f"{name} must be a number, got {value!r}") from None
+
+
+def env_json(name: str) -> Optional[Dict]:
+    value = os.getenv(name)
+    if not value:
+        return None
+    try:
+        parsed = json.loads(value)
+    except ValueError:
+        raise ValueError(f"{name} must be a JSON object, got {value!r}") from None
+    if not isinstance(parsed, dict):
+        raise ValueError(f"{name} must be a JSON object, got {value!r}")
+    return parsed
@@ -0,0 +1,152 @@
+import json
+import time
+import hashlib
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+
+class SpeechClient():
+    """
+    Keep-alive HTTP client for one speech service (TTS or STT).
+
+    A single Session per upstream reuses TCP connections. pool_block caps the number of
+    concurrent connections to pool_size, and connection errors are retried with
+    exponential backoff (connect failures only, so a request body is never sent twice).
+    """
+
+    def __init__(self, base_url: str, pool_size: int = 16, retries: int = 3, backoff_factor: float = 0.3):
+        self.base_url = base_url.rstrip('/')
+        retry = Retry(total=retries, connect=retries, read=0, status=0, other=0,
+                      backoff_factor=backoff_factor, allowed_methods=None, raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, pool_block=True, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def get(self, path: str, **kwargs) -> requests.Response:
+        return self.session.get(f"{self.base_url}{path}", **kwargs)
+
+    def post(self, path: str, **kwargs) -> requests.Response:
+        return self.session.post(f"{self.base_url}{path}", **kwargs)
+
+
+class RequestBodyStream():
+    """
+    File-like wrapper that lets requests forward an incoming body without buffering it.
+
+    With a known length requests sends it as the Content-Length; pass iter(body) instead
+    when the length is unknown (a chunked upload) and requests uses chunked encoding too.
+    """
+
+    def __init__(self, stream, length: Optional[int], chunk_size: int = 64 * 1024):
+        self.stream = stream
+        self.length = length
+        self.chunk_size = chunk_size
+
+    def read(self, size: int = -1) -> bytes:
+        return self.stream.read(size if size and size > 0 else self.chunk_size)
+
+    def __len__(self) -> int:
+        return self.length or 0
+
+    def __iter__(self):
+        while True:
+            chunk = self.read(self.chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+
+def iter_response_body(response: requests.Response, chunk_size: int = 64 * 1024):
+    """Relay a streamed upstream body chunk by chunk, returning the connection to the pool at the end."""
+    try:
+        for chunk in response.iter_content(chunk_size=chunk_size):
+            if chunk:
+                yield chunk
+    finally:
+        response.close()
+
+
+class CachedResource():
+    """
+    TTL cache for a static upstream JSON payload (voice and language lists).
+
+    Past its TTL the cached value is still served while a background thread refreshes it
+    (stale-while-revalidate); if the upstream is down, the stale value keeps being served
+    for up to stale_ttl seconds. With nothing usable cached, concurrent callers share a
+    single upstream fetch instead of each making their own.
+    """
+
+    def __init__(self, fetch, ttl: float = 300, stale_ttl: float = 86400):
+        self.fetch = fetch
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.payload = None
+        self.etag = None
+        self.fetched_at = 0.0
+        self.__lock = threading.Lock()
+        self.__refreshing = False
+        self.__inflight: Optional[Future] = None
+
+    # PRIVATE METHODS #
+    def __refresh(self) -> None:
+        try:
+            payload = self.fetch()
+            etag = '"' + hashlib.sha1(json.dumps(payload, sort_keys=True).encode('utf-8')).hexdigest() + '"'
+            with self.__lock:
+                self.payload, self.etag, self.fetched_at = payload, etag, time.time()
+        finally:
+            with self.__lock:
+                self.__refreshing = False
+
+    def __refresh_in_background(self) -> None:
+        def run():
+            try:
+                self.__refresh()
+            except Exception as e:
+                logger.warning(f"Background refresh failed, serving stale value: {str(e)}")
+
+        with self.__lock:
+            if self.__refreshing:
+                return
+            self.__refreshing = True
+        threading.Thread(target=run, daemon=True).start()
+
+    # PUBLIC METHODS #
+    def get(self):
+        """Return (payload, etag); raises if nothing usable is cached and the upstream fails."""
+        age = time.time() - self.fetched_at
+        if self.payload is not None and age < self.ttl:
+            return self.payload, self.etag
+        if self.payload is not None and age < self.ttl + self.stale_ttl:
+            self.__refresh_in_background()
+            return self.payload, self.etag
+
+        with self.__lock:
+            future, owner = self.__inflight, self.__inflight is None
+            if owner:
+                future = self.__inflight = Future()
+                self.__refreshing = True
+        if not owner:
+            # Another request is already fetching: wait for its result (or its error)
+            future.result()
+            return self.payload, self.etag
+
+        try:
+            self.__refresh()
+            future.set_result(None)
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self.__lock:
+                self.__inflight = None
+        return self.payload, self.etag
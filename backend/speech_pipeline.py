@@ -0,0 +1,111 @@
+import re
+import base64
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+
+# End of a sentence: terminal punctuation followed by whitespace, or directly by a capital letter
+# ("today?Fine", but not "U.S."), or a line break (list items, headings)
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])[\"')\]]*\s+|(?<=[a-z][.!?])[\"')\]]*(?=[A-Z])|\n+")
+# A numbered list marker ("2.") opens the next sentence rather than ending the previous one
+LIST_MARKER = re.compile(r"\d+[.)]")
+
+
+class SentenceSplitter():
+    """
+    Incrementally cuts streamed LLM tokens into sentences for TTS.
+
+    Pieces shorter than min_chars are merged into the next sentence, except across a
+    list marker: "1. Greet the guest. 2. Offer water." gives one piece per item, each
+    starting with its marker. Anything longer than max_chars is cut at a word boundary
+    so each piece stays under the TTS service's text limit.
+    """
+
+    def __init__(self, min_chars: int = 20, max_chars: int = 400):
+        self.min_chars = min_chars
+        self.max_chars = max_chars
+        self.buffer = ""
+
+    # PRIVATE METHODS #
+    def __cut_long(self) -> List[str]:
+        pieces = []
+        while len(self.buffer) > self.max_chars:
+            cut = self.buffer.rfind(" ", 0, self.max_chars)
+            if cut <= 0:
+                cut = self.max_chars
+            pieces.append(self.buffer[:cut].strip())
+            self.buffer = self.buffer[cut:].lstrip()
+        return pieces
+
+    # PUBLIC METHODS #
+    def feed(self, text: str) -> List[str]:
+        self.buffer += text
+        sentences = []
+        start = 0
+        last_end = 0
+        for match in SENTENCE_BOUNDARY.finditer(self.buffer):
+            if LIST_MARKER.fullmatch(self.buffer[last_end:match.end()].strip()):
+                # Close the previous item, however short, and keep the marker for the next one
+                previous = self.buffer[start:last_end].strip()
+                if previous:
+                    sentences.append(previous)
+                start = last_end
+                last_end = match.end()
+                continue
+            last_end = match.end()
+            candidate = self.buffer[start:match.end()].strip()
+            if len(candidate) >= self.min_chars:
+                sentences.append(candidate)
+                start = match.end()
+        self.buffer = self.buffer[start:]
+        sentences.extend(self.__cut_long())
+        return sentences
+
+    def flush(self) -> List[str]:
+        rest = self.buffer.strip()
+        self.buffer = ""
+        return [rest] if rest else []
+
+
+def stream_answer_with_audio(tokens: Iterable[str],
+                             synthesize: Callable[[str], bytes],
+                             audio_format: str = "wav",
+                             max_parallel: int = 2) -> Iterator[Tuple[Optional[str], dict]]:
+    """
+    Pipeline the LLM token stream into TTS.
+
+    Each completed sentence is sent to synthesize() as soon as it is produced, while
+    the LLM keeps generating; audio is emitted in sentence order as soon as it is ready.
+    Yields (event, payload) pairs: (None, {"token"}) for text, ("audio", {...}) or
+    ("audio_error", {...}) per sentence, and finally ("done", {"answer"}).
+    """
+    splitter = SentenceSplitter()
+    pending = deque()
+    answer = []
+    n_sentences = 0
+
+    def collect(block: bool):
+        while pending and (block or pending[0][2].done()):
+            index, sentence, future = pending.popleft()
+            try:
+                audio = future.result()
+                yield "audio", {"index": index, "text": sentence, "format": audio_format,
+                                "audio": base64.b64encode(audio).decode("ascii")}
+            except Exception as e:
+                yield "audio_error", {"index": index, "text": sentence, "error": str(e)}
+
+    with ThreadPoolExecutor(max_workers=max_parallel) as executor:
+        for token in tokens:
+            answer.append(token)
+            yield None, {"token": token}
+            for sentence in splitter.feed(token):
+                pending.append((n_sentences, sentence, executor.submit(synthesize, sentence)))
+                n_sentences += 1
+            yield from collect(block=False)
+
+        for sentence in splitter.flush():
+            pending.append((n_sentences, sentence, executor.submit(synthesize, sentence)))
+            n_sentences += 1
+        yield from collect(block=True)
+
+    yield "done", {"answer": "".join(answer)}
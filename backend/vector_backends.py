@@ -0,0 +1,62 @@
+"""Write-side operations used by ingestion, for each supported vector store backend (Milvus or LocalVectorStore)."""
+from typing import Dict, List
+
+from local_vector_store import LocalVectorStore
+
+VECTOR_BACKENDS = ("milvus", "local")
+
+
+def count_chunks(vector_store) -> int:
+    if isinstance(vector_store, LocalVectorStore):
+        return vector_store.count()
+    return 0 if vector_store.col is None else vector_store.col.num_entities
+
+
+def inserts_are_durable(vector_store) -> bool:
+    # Milvus persists inserts through its log before a flush; the local store only on flush()
+    return not isinstance(vector_store, LocalVectorStore)
+
+
+def delete_chunks(vector_store, chunk_ids: List) -> None:
+    if not chunk_ids:
+        return
+    if isinstance(vector_store, LocalVectorStore):
+        vector_store.delete(list(chunk_ids))
+    elif vector_store.col is not None:
+        vector_store.col.delete(expr=f"{vector_store._primary_field} in {list(chunk_ids)}")
+
+
+def insert_embeddings(vector_store, texts: List[str], vectors: List[List[float]], metadatas: List[Dict],
+                      batch_size: int = 1000) -> List:
+    """Insert pre-computed vectors without flushing; returns the new chunk IDs in order."""
+    if isinstance(vector_store, LocalVectorStore):
+        return vector_store.add_embeddings(texts, vectors, metadatas)
+
+    from pymilvus import Collection
+
+    # First insert into a new collection: let LangChain create the schema and index
+    if not isinstance(vector_store.col, Collection):
+        vector_store._init(embeddings=vectors, metadatas=metadatas)
+
+    columns = {vector_store._text_field: texts, vector_store._vector_field: vectors}
+    if vector_store._metadata_field is not None:
+        columns[vector_store._metadata_field] = metadatas
+    else:
+        for metadata in metadatas:
+            for key, value in metadata.items():
+                if key in vector_store.fields:
+                    columns.setdefault(key, []).append(value)
+
+    primary_keys = []
+    for start in range(0, len(texts), batch_size):
+        end = start + batch_size
+        result = vector_store.col.insert([columns[field][start:end] for field in vector_store.fields])
+        primary_keys.extend(result.primary_keys)
+    return primary_keys
+
+
+def flush(vector_store) -> None:
+    if isinstance(vector_store, LocalVectorStore):
+        vector_store.flush()
+    elif vector_store.col is not None:
+        vector_store.col.flush()
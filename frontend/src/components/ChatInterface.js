@@ -2,6 +2,13 @@ import React, { useState, useRef, useEffect } from 'react';
 import axios from 'axios';
 import './ChatInterface.css';
 
+// One conversation history per browser tab on the backend
+const createSessionId = () => (
+  window.crypto && window.crypto.randomUUID
+    ? window.crypto.randomUUID()
+    : `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}`
+);
+
 const ChatInterface = () => {
   const [messages, setMessages] = useState([
     {
@@ -18,6 +25,7 @@ const ChatInterface = () => {
   const mediaRecorderRef = useRef(null);
   const audioChunksRef = useRef([]);
   const silenceTimerRef = useRef(null);
+  const sessionIdRef = useRef(createSessionId());
 
   const scrollToBottom = () => {
     messagesEndRef.current?.scrollIntoView({ behavior: "smooth" });
@@ -132,6 +140,68 @@ const ChatInterface = () => {
     }
   };
 
+  // Stream the answer from /api/chat/stream (SSE) and render tokens as they arrive
+  const streamAnswer = async (question) => {
+    const response = await fetch('/api/chat/stream', {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json', 'X-Session-ID': sessionIdRef.current },
+      body: JSON.stringify({ question })
+    });
+    if (!response.ok || !response.body) {
+      throw new Error(`Chat stream failed with status ${response.status}`);
+    }
+
+    const timestamp = new Date();
+    let answer = '';
+    let started = false;
+    const render = (content) => {
+      setMessages(prev => {
+        const botMessage = { type: 'bot', content, timestamp };
+        if (!started) {
+          started = true;
+          return [...prev, botMessage];
+        }
+        return [...prev.slice(0, -1), botMessage];
+      });
+    };
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    while (true) {
+      const { done, value } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+
+      // SSE events are separated by a blank line
+      const events = buffer.split('\n\n');
+      buffer = events.pop();
+      for (const rawEvent of events) {
+        let eventType = 'message';
+        let data = '';
+        rawEvent.split('\n').forEach(line => {
+          if (line.startsWith('event:')) eventType = line.slice(6).trim();
+          if (line.startsWith('data:')) data += line.slice(5).trim();
+        });
+        if (!data) continue;
+        const payload = JSON.parse(data);
+
+        if (eventType === 'error') {
+          throw new Error(payload.error);
+        }
+        if (eventType === 'done') {
+          answer = payload.answer;
+        } else {
+          answer += payload.token;
+        }
+        // First token replaces the typing indicator
+        setIsLoading(false);
+        render(answer);
+      }
+    }
+    return answer;
+  };
+
   const handleVoiceMessage = async (text) => {
     const userMessage = {
       type: 'user',
@@ -143,20 +213,10 @@ const ChatInterface = () => {
     setIsLoading(true);
 
     try {
-      const response = await axios.post('/api/chat', {
-        question: text
-      });
+      const answer = await streamAnswer(text);
 
-      const botMessage = {
-        type: 'bot',
-        content: response.data.answer,
-        timestamp: new Date()
-      };
-
-      setMessages(prev => [...prev, botMessage]);
-      
       // Automatically speak the response
-      await speakResponse(response.data.answer);
+      await speakResponse(answer);
     } catch (error) {
       const errorMessage = {
         type: 'bot',
@@ -211,24 +271,11 @@ const ChatInterface = () => {
     setIsLoading(true);
 
     try {
-      // Use relative URL which will be handled by the nginx reverse proxy
-      const apiUrl = '/api/chat';
-      console.log('Connecting to API at:', apiUrl);
-      
-      const response = await axios.post(apiUrl, {
-        question: inputValue
-      });
+      // Relative URL handled by the nginx reverse proxy; tokens render as they stream in
+      const answer = await streamAnswer(inputValue);
 
-      const botMessage = {
-        type: 'bot',
-        content: response.data.answer,
-        timestamp: new Date()
-      };
-
-      setMessages(prev => [...prev, botMessage]);
-      
       // Automatically speak the response
-      await speakResponse(response.data.answer);
+      await speakResponse(answer);
     } catch (error) {
       const errorMessage = {
         type: 'bot',
@@ -1,15 +1,20 @@
 import os
+import time
+import queue
 import logging
-from typing import Optional, Dict
-from flask import Flask, request, jsonify
+import threading
+import uuid
+from concurrent.futures import Future
+from typing import BinaryIO, Optional, Dict, List, Tuple, Union
+from flask import Flask, Response, g, request, jsonify
 from flask_cors import CORS
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
 import torch
-from faster_whisper import WhisperModel
+from faster_whisper import BatchedInferencePipeline, WhisperModel, decode_audio
+from faster_whisper.vad import VadOptions, get_speech_timestamps, merge_segments
 import tempfile
 import io
-import uuid
 from pathlib import Path
-import librosa
 import numpy as np
 
 # Configure logging per CLAUDE.md standards
@@ -18,26 +23,215 @@ logger = logging.getLogger(__name__)
 
 class STTConfig:
     """Configuration class to avoid magic numbers"""
-    MODEL_SIZE = "medium"  # tiny, base, small, medium, large
-    DEVICE = "cuda" if torch.cuda.is_available() else "cpu"
-    COMPUTE_TYPE = "float16" if torch.cuda.is_available() else "int8"
+    # Performance profiles: model size, precision and threading per deployment target
+    PROFILES = {
+        "cpu-fast": {"model_size": "tiny", "device": "cpu", "compute_type": "int8", "cpu_threads": 4, "num_workers": 1},
+        "cpu-accurate": {"model_size": "small", "device": "cpu", "compute_type": "int8", "cpu_threads": 8, "num_workers": 2},
+        "gpu": {"model_size": "medium", "device": "cuda", "compute_type": "float16", "cpu_threads": 4, "num_workers": 2},
+        "gpu-large": {"model_size": "large-v3", "device": "cuda", "compute_type": "float16", "cpu_threads": 4, "num_workers": 2},
+    }
+    PROFILE = os.getenv("STT_PROFILE", "gpu" if torch.cuda.is_available() else "cpu-fast")
+    MODEL_SIZE = os.getenv("STT_MODEL_SIZE", PROFILES[PROFILE]["model_size"])  # tiny, base, small, medium, large-v3
+    DEVICE = PROFILES[PROFILE]["device"]
+    COMPUTE_TYPE = os.getenv("STT_COMPUTE_TYPE", PROFILES[PROFILE]["compute_type"])
+    CPU_THREADS = int(os.getenv("STT_CPU_THREADS", PROFILES[PROFILE]["cpu_threads"]))
+    NUM_WORKERS = int(os.getenv("STT_NUM_WORKERS", PROFILES[PROFILE]["num_workers"]))
     MAX_AUDIO_DURATION = 300  # seconds
     SUPPORTED_FORMATS = ["wav", "mp3", "m4a", "ogg", "flac"]
     SAMPLE_RATE = 16000
+    SILENCE_THRESHOLD = 1e-4  # peak amplitude below which input is treated as silence
     CACHE_DIR = "/tmp/stt_cache"
+    CHUNK_LENGTH = 30  # seconds of audio per Whisper window
+    # Dynamic batching of concurrent /transcribe requests
+    BATCHING_ENABLED = os.getenv("STT_BATCHING", "1") == "1"
+    BATCH_SIZE = int(os.getenv("STT_BATCH_SIZE", "8"))
+    BATCH_WAIT_MS = int(os.getenv("STT_BATCH_WAIT_MS", "50"))
+    # Streaming transcription (/transcribe/stream): raw 16-bit mono PCM at SAMPLE_RATE
+    STREAM_MIN_SILENCE_MS = 500  # silence that ends an utterance
+    STREAM_PARTIAL_INTERVAL = 1.0  # seconds of new speech between partial results
+    STREAM_MAX_UTTERANCE = 30  # seconds; longer utterances are cut and finalized
+    STREAM_SESSION_TTL = 60  # seconds of inactivity before a stream is dropped
+
+# Prometheus metrics, served on /metrics
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+REQUEST_SECONDS = Histogram("http_request_duration_seconds", "HTTP request duration",
+                            ["endpoint", "method", "status"], buckets=LATENCY_BUCKETS)
+REQUESTS_IN_FLIGHT = Gauge("http_requests_in_flight", "Requests currently being served", ["endpoint"])
+STAGE_SECONDS = Histogram("stt_stage_seconds", "Time per transcription stage",
+                          ["stage"], buckets=LATENCY_BUCKETS)
+AUDIO_SECONDS = Counter("stt_audio_seconds_total", "Seconds of audio transcribed")
+BATCH_SIZE = Histogram("stt_batch_size", "Jobs per batched inference pass", buckets=(1, 2, 4, 8, 16, 32))
+QUEUE_DEPTH = Gauge("stt_queue_depth", "Jobs waiting for the batching scheduler")
+MODEL_LOAD_SECONDS = Gauge("stt_model_load_seconds", "Model load and warm-up time")
+MODEL_READY = Gauge("stt_model_ready", "1 once the model is loaded and warmed up")
+
+class TranscriptionScheduler:
+    """
+    Collects concurrent transcription jobs for up to BATCH_WAIT_MS and runs them as one batch
+    
+    A single worker thread owns batched inference; callers block on a per-request Future.
+    """
+    
+    def __init__(self, run_batch, max_batch_size: int = 8, max_wait_ms: int = 50):
+        self.run_batch = run_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.jobs: "queue.Queue[Tuple[np.ndarray, Optional[str], Future]]" = queue.Queue()
+        self.batches = 0
+        self.batched_jobs = 0
+        self.last_batch_size = 0
+        self.max_seen_batch_size = 0
+        self.worker = threading.Thread(target=self._run, name="stt-batcher", daemon=True)
+        self.worker.start()
+        QUEUE_DEPTH.set_function(self.jobs.qsize)
+    
+    def submit(self, audio: np.ndarray, language: Optional[str]) -> Future:
+        """Queue one preprocessed clip; the Future resolves to its transcription result"""
+        future = Future()
+        self.jobs.put((audio, language, future))
+        return future
+    
+    def _collect_batch(self) -> list:
+        batch = [self.jobs.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.jobs.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+    
+    def _run(self) -> None:
+        while True:
+            batch = self._collect_batch()
+            self.batches += 1
+            self.batched_jobs += len(batch)
+            self.last_batch_size = len(batch)
+            self.max_seen_batch_size = max(self.max_seen_batch_size, len(batch))
+            BATCH_SIZE.observe(len(batch))
+            try:
+                started = time.perf_counter()
+                results = self.run_batch([(audio, language) for audio, language, _ in batch])
+                STAGE_SECONDS.labels(stage="batch_inference").observe(time.perf_counter() - started)
+                for (_, _, future), result in zip(batch, results):
+                    future.set_result(result)
+            except Exception as e:
+                logger.error(f"Batched transcription failed: {str(e)}")
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+    
+    def get_metrics(self) -> Dict:
+        """Queue depth and batch-size statistics"""
+        return {
+            "queue_depth": self.jobs.qsize(),
+            "batches": self.batches,
+            "jobs": self.batched_jobs,
+            "last_batch_size": self.last_batch_size,
+            "max_batch_size": self.max_seen_batch_size,
+            "avg_batch_size": round(self.batched_jobs / self.batches, 2) if self.batches else 0.0
+        }
+
+class StreamingSession:
+    """
+    Incremental transcription of one live audio stream
+    
+    Frames are appended to a buffer of not-yet-finalized audio. Silero VAD runs over that
+    buffer on every frame: once speech is followed by STREAM_MIN_SILENCE_MS of silence the
+    utterance is transcribed and emitted as a final segment, and while someone is still
+    talking a partial result is emitted every STREAM_PARTIAL_INTERVAL seconds.
+    """
+    
+    def __init__(self, transcribe, language: Optional[str] = None):
+        self.transcribe = transcribe
+        self.language = language
+        self.buffer = np.zeros(0, dtype=np.float32)
+        self.buffer_offset = 0  # absolute sample index of buffer[0]
+        self.last_partial_at = 0  # buffer length at the last partial
+        self.final_texts: List[str] = []
+        self.last_activity = time.monotonic()
+        self.pending_byte = b""  # odd trailing byte of the last frame, completed by the next one
+        self.lock = threading.Lock()
+        self.vad_options = VadOptions(min_silence_duration_ms=STTConfig.STREAM_MIN_SILENCE_MS, speech_pad_ms=200)
+    
+    def _segment(self, start: int, end: int, kind: str) -> Optional[Dict]:
+        result = self.transcribe(self.buffer[start:end].copy(), self.language)
+        text = result["text"].strip()
+        if not text:
+            return None
+        if self.language is None and result.get("language"):
+            # Stick to the detected language for the rest of the stream
+            self.language = result["language"]
+        return {
+            "type": kind,
+            "text": text,
+            "start": round((self.buffer_offset + start) / STTConfig.SAMPLE_RATE, 2),
+            "end": round((self.buffer_offset + end) / STTConfig.SAMPLE_RATE, 2)
+        }
+    
+    def _finalize(self, end: int) -> List[Dict]:
+        events = []
+        event = self._segment(0, end, "final")
+        if event:
+            self.final_texts.append(event["text"])
+            events.append(event)
+        self.buffer = self.buffer[end:]
+        self.buffer_offset += end
+        self.last_partial_at = 0
+        return events
+    
+    def feed(self, pcm: bytes) -> List[Dict]:
+        """Append 16-bit PCM and return any partial/final segments it completes"""
+        self.last_activity = time.monotonic()
+        # Frames can end mid-sample: carry the odd byte over instead of shifting every later sample
+        pcm = self.pending_byte + pcm
+        split = len(pcm) - len(pcm) % 2
+        self.pending_byte = pcm[split:]
+        samples = np.frombuffer(pcm[:split], dtype=np.int16).astype(np.float32) / 32768.0
+        self.buffer = np.concatenate([self.buffer, samples])
+        
+        speech = get_speech_timestamps(self.buffer, self.vad_options)
+        if not speech:
+            # Nothing said yet: keep only a short tail so the buffer stays bounded
+            keep = STTConfig.SAMPLE_RATE // 2
+            if len(self.buffer) > keep:
+                self.buffer_offset += len(self.buffer) - keep
+                self.buffer = self.buffer[-keep:]
+            return []
+        
+        min_silence = STTConfig.STREAM_MIN_SILENCE_MS * STTConfig.SAMPLE_RATE // 1000
+        speech_end = speech[-1]["end"]
+        if len(self.buffer) - speech_end >= min_silence:
+            return self._finalize(speech_end)
+        if len(self.buffer) >= STTConfig.STREAM_MAX_UTTERANCE * STTConfig.SAMPLE_RATE:
+            return self._finalize(len(self.buffer))
+        
+        if len(self.buffer) - self.last_partial_at >= STTConfig.STREAM_PARTIAL_INTERVAL * STTConfig.SAMPLE_RATE:
+            self.last_partial_at = len(self.buffer)
+            event = self._segment(speech[0]["start"], len(self.buffer), "partial")
+            return [event] if event else []
+        return []
+    
+    def close(self) -> List[Dict]:
+        """Finalize whatever speech is still buffered"""
+        if len(self.buffer) and get_speech_timestamps(self.buffer, self.vad_options):
+            return self._finalize(len(self.buffer))
+        return []
 
 class STTService:
     """Speech-to-Text service using Faster-Whisper with GPU acceleration"""
     
     def __init__(self):
-        logger.info(f"Initializing STT service on device: {STTConfig.DEVICE}")
-        
-        # Initialize Faster-Whisper model
-        self.model = WhisperModel(
-            STTConfig.MODEL_SIZE,
-            device=STTConfig.DEVICE,
-            compute_type=STTConfig.COMPUTE_TYPE
-        )
+        # Model, batched pipeline and scheduler are created by load() in the background
+        self.model = None
+        self.batched_model = None
+        self.scheduler = None
+        self.ready = threading.Event()
+        self.load_error: Optional[str] = None
+        self.load_seconds: Optional[float] = None
         
         # Language detection and transcription settings
         self.transcription_settings = {
@@ -49,68 +243,140 @@ class STTService:
         
         # Ensure cache directory exists
         Path(STTConfig.CACHE_DIR).mkdir(exist_ok=True)
-        logger.info("STT service initialized successfully")
     
-    def preprocess_audio(self, audio_path: str) -> Optional[str]:
-        """
-        Preprocess audio to ensure compatibility with Whisper
-        
-        Args:
-            audio_path: Path to input audio file
-            
-        Returns:
-            Path to preprocessed audio or None if failed
-        """
+    def load(self) -> None:
+        """Load the Whisper model for the configured profile and warm it up"""
         try:
-            # Load audio with librosa (handles multiple formats)
-            audio, sr = librosa.load(audio_path, sr=STTConfig.SAMPLE_RATE)
+            started = time.monotonic()
+            logger.info(f"Loading STT model '{STTConfig.MODEL_SIZE}' ({STTConfig.PROFILE} profile) on {STTConfig.DEVICE}")
             
-            # Check duration
-            duration = len(audio) / sr
-            if duration > STTConfig.MAX_AUDIO_DURATION:
-                logger.warning(f"Audio duration {duration}s exceeds limit {STTConfig.MAX_AUDIO_DURATION}s")
-                return None
+            # Initialize Faster-Whisper model
+            self.model = WhisperModel(
+                STTConfig.MODEL_SIZE,
+                device=STTConfig.DEVICE,
+                compute_type=STTConfig.COMPUTE_TYPE,
+                cpu_threads=STTConfig.CPU_THREADS,
+                num_workers=STTConfig.NUM_WORKERS
+            )
             
-            # Save preprocessed audio
-            audio_id = str(uuid.uuid4())
-            output_path = f"{STTConfig.CACHE_DIR}/{audio_id}.wav"
+            # Concurrent requests share batched inference on the same model
+            self.batched_model = BatchedInferencePipeline(model=self.model)
             
-            # Normalize audio
-            audio = audio / np.max(np.abs(audio))
+            # Warm-up so the first real request doesn't pay for kernel selection and allocations
+            warmup_audio = np.random.default_rng(0).normal(0, 0.01, STTConfig.SAMPLE_RATE).astype(np.float32)
+            segments, _ = self.model.transcribe(warmup_audio, language="en", beam_size=1)
+            list(segments)
             
-            # Save as WAV for Whisper
-            import soundfile as sf
-            sf.write(output_path, audio, STTConfig.SAMPLE_RATE)
+            self.scheduler = TranscriptionScheduler(
+                self.transcribe_batch,
+                max_batch_size=STTConfig.BATCH_SIZE,
+                max_wait_ms=STTConfig.BATCH_WAIT_MS
+            ) if STTConfig.BATCHING_ENABLED else None
             
-            logger.debug(f"Audio preprocessed: {duration:.2f}s duration")
-            return output_path
+            self.load_seconds = round(time.monotonic() - started, 2)
+            MODEL_LOAD_SECONDS.set(self.load_seconds)
+            MODEL_READY.set(1)
+            self.ready.set()
+            logger.info(f"STT service initialized successfully in {self.load_seconds}s")
             
         except Exception as e:
-            logger.error(f"Audio preprocessing failed: {str(e)}")
+            self.load_error = str(e)
+            logger.error(f"STT model loading failed: {str(e)}")
+    
+    def start_loading(self) -> None:
+        """Load the model on a background thread so the HTTP server (and liveness) is up immediately"""
+        threading.Thread(target=self.load, name="stt-model-loader", daemon=True).start()
+    
+    def load_audio(self, audio_source: Union[str, BinaryIO]) -> np.ndarray:
+        """
+        Decode audio straight into a mono float32 array at the Whisper sample rate
+        
+        Args:
+            audio_source: Path or binary file-like object (e.g. an upload stream), any format FFmpeg reads
+            
+        Returns:
+            Decoded audio samples
+        """
+        return decode_audio(audio_source, sampling_rate=STTConfig.SAMPLE_RATE)
+    
+    def preprocess_audio(self, audio: np.ndarray) -> Optional[np.ndarray]:
+        """
+        Validate and peak-normalize decoded audio in place
+        
+        Args:
+            audio: Mono float32 samples at STTConfig.SAMPLE_RATE
+            
+        Returns:
+            The same array normalized, or None if it is too long
+        """
+        # Check duration
+        duration = len(audio) / STTConfig.SAMPLE_RATE
+        if duration > STTConfig.MAX_AUDIO_DURATION:
+            logger.warning(f"Audio duration {duration}s exceeds limit {STTConfig.MAX_AUDIO_DURATION}s")
             return None
+        
+        # Normalize audio; silent input is left as-is instead of dividing by zero
+        peak = float(np.max(np.abs(audio))) if audio.size else 0.0
+        if peak > STTConfig.SILENCE_THRESHOLD:
+            audio /= peak
+        
+        logger.debug(f"Audio preprocessed: {duration:.2f}s duration")
+        return audio
+    
+    def is_silent(self, audio: np.ndarray) -> bool:
+        """True when there is nothing to transcribe"""
+        return audio.size == 0 or float(np.max(np.abs(audio))) <= STTConfig.SILENCE_THRESHOLD
     
-    def transcribe_audio(self, audio_path: str, language: Optional[str] = None) -> Dict:
+    def transcribe_audio(self, audio_source: Union[str, BinaryIO, np.ndarray], language: Optional[str] = None) -> Dict:
         """
-        Transcribe audio file to text
+        Transcribe audio to text
         
         Args:
-            audio_path: Path to audio file
+            audio_source: Path, binary file-like object or already decoded float32 samples
             language: Language code (auto-detect if None)
             
         Returns:
             Dictionary with transcription results
         """
         try:
-            # Preprocess audio
-            processed_path = self.preprocess_audio(audio_path)
-            if not processed_path:
+            if not self.ready.is_set():
+                raise RuntimeError("STT model is still loading")
+            
+            # Decode and preprocess in memory - no temp files
+            started = time.perf_counter()
+            if not isinstance(audio_source, np.ndarray):
+                audio_source = self.load_audio(audio_source)
+                STAGE_SECONDS.labels(stage="decode").observe(time.perf_counter() - started)
+                started = time.perf_counter()
+            audio = self.preprocess_audio(audio_source)
+            STAGE_SECONDS.labels(stage="preprocess").observe(time.perf_counter() - started)
+            if audio is None:
                 raise ValueError("Audio preprocessing failed")
+            AUDIO_SECONDS.inc(len(audio) / STTConfig.SAMPLE_RATE)
+            
+            if self.is_silent(audio):
+                logger.info("Silent audio, skipping transcription")
+                return {
+                    "text": "",
+                    "language": language,
+                    "language_probability": 0.0,
+                    "duration": round(len(audio) / STTConfig.SAMPLE_RATE, 2),
+                    "segments": []
+                }
             
             logger.debug(f"Transcribing audio with language: {language or 'auto-detect'}")
             
+            if self.scheduler is not None:
+                # Time from queueing until the batch containing this clip has been transcribed
+                started = time.perf_counter()
+                result = self.scheduler.submit(audio, language).result()
+                STAGE_SECONDS.labels(stage="queue_wait_and_inference").observe(time.perf_counter() - started)
+                return result
+            
             # Transcribe with Faster-Whisper
+            started = time.perf_counter()
             segments, info = self.model.transcribe(
-                processed_path,
+                audio,
                 language=language,
                 **self.transcription_settings
             )
@@ -128,6 +394,8 @@ class STTService:
                     "confidence": round(segment.avg_logprob, 3)
                 })
             
+            STAGE_SECONDS.labels(stage="inference").observe(time.perf_counter() - started)
+            
             result = {
                 "text": transcription_text.strip(),
                 "language": info.language,
@@ -138,18 +406,78 @@ class STTService:
             
             logger.info(f"Transcription completed: {len(transcription_text)} characters")
             
-            # Cleanup preprocessed file
-            try:
-                os.unlink(processed_path)
-            except:
-                pass
-            
             return result
             
         except Exception as e:
             logger.error(f"Transcription failed: {str(e)}")
             raise
     
+    def transcribe_batch(self, jobs: List[Tuple[np.ndarray, Optional[str]]]) -> List[Dict]:
+        """
+        Transcribe several clips with one batched inference pass per language
+        
+        Clips are laid end to end and each one is cut into <=30 s voiced chunks with VAD, so
+        a batch never mixes audio from two requests; segments are mapped back by offset.
+        
+        Args:
+            jobs: (preprocessed audio, language code or None) pairs
+            
+        Returns:
+            One result dictionary per job, in order
+        """
+        vad_options = VadOptions(max_speech_duration_s=STTConfig.CHUNK_LENGTH, min_silence_duration_ms=160)
+        results: List[Optional[Dict]] = [None] * len(jobs)
+        groups: Dict[str, list] = {}
+        
+        for index, (audio, language) in enumerate(jobs):
+            language_probability = 1.0
+            if language is None:
+                language, language_probability, _ = self.model.detect_language(audio=audio)
+            groups.setdefault(language, []).append((index, audio, language_probability))
+        
+        for language, members in groups.items():
+            offsets = []
+            clip_timestamps = []
+            position = 0
+            for index, audio, _ in members:
+                offsets.append(position)
+                speech = get_speech_timestamps(audio, vad_options)
+                for chunk in merge_segments(speech, vad_options):
+                    clip_timestamps.append({"start": chunk["start"] + position, "end": chunk["end"] + position})
+                position += len(audio)
+            
+            segments = []
+            if clip_timestamps:
+                batch_segments, _ = self.batched_model.transcribe(
+                    np.concatenate([audio for _, audio, _ in members]),
+                    language=language,
+                    clip_timestamps=clip_timestamps,
+                    batch_size=STTConfig.BATCH_SIZE,
+                    beam_size=self.transcription_settings["beam_size"],
+                    temperature=self.transcription_settings["temperature"]
+                )
+                segments = list(batch_segments)
+            
+            for member, (index, audio, language_probability) in enumerate(members):
+                start = offsets[member] / STTConfig.SAMPLE_RATE
+                end = start + len(audio) / STTConfig.SAMPLE_RATE
+                own_segments = [segment for segment in segments if start <= segment.start < end]
+                results[index] = {
+                    "text": " ".join(segment.text.strip() for segment in own_segments).strip(),
+                    "language": language,
+                    "language_probability": round(language_probability, 3),
+                    "duration": round(len(audio) / STTConfig.SAMPLE_RATE, 2),
+                    "segments": [{
+                        "start": round(segment.start - start, 2),
+                        "end": round(segment.end - start, 2),
+                        "text": segment.text.strip(),
+                        "confidence": round(segment.avg_logprob, 3)
+                    } for segment in own_segments]
+                }
+        
+        logger.info(f"Batch of {len(jobs)} transcriptions completed")
+        return results
+    
     def get_supported_languages(self) -> list:
         """Get list of supported languages"""
         return [
@@ -161,19 +489,82 @@ class STTService:
 app = Flask(__name__)
 CORS(app, resources={r"/*": {"origins": "*", "allow_headers": "*", "expose_headers": "*"}})
 
-# Initialize STT service
+# Initialize STT service; the model loads in the background
 stt_service = STTService()
+stt_service.start_loading()
+
+# Live streaming sessions by ID
+stream_sessions: Dict[str, StreamingSession] = {}
+stream_sessions_lock = threading.Lock()
+
+def expire_stream_sessions() -> None:
+    """Drop streams that have been idle longer than STREAM_SESSION_TTL"""
+    now = time.monotonic()
+    with stream_sessions_lock:
+        for session_id in [sid for sid, session in stream_sessions.items()
+                           if now - session.last_activity > STTConfig.STREAM_SESSION_TTL]:
+            del stream_sessions[session_id]
+
+@app.before_request
+def start_request():
+    # Request ID forwarded by the backend gateway, so timings can be matched across services
+    g.request_id = request.headers.get('X-Request-ID') or uuid.uuid4().hex
+    g.started = time.perf_counter()
+    if request.endpoint != 'metrics':
+        REQUESTS_IN_FLIGHT.labels(endpoint=request.endpoint or 'unknown').inc()
+
+@app.after_request
+def finish_request(response):
+    response.headers['X-Request-ID'] = g.request_id
+    if request.endpoint != 'metrics':
+        endpoint, method, started, request_id = request.endpoint or 'unknown', request.method, g.started, g.request_id
+        
+        # Streamed responses are only finished once the body has been sent
+        def finish():
+            elapsed = time.perf_counter() - started
+            REQUEST_SECONDS.labels(endpoint=endpoint, method=method, status=response.status_code).observe(elapsed)
+            REQUESTS_IN_FLIGHT.labels(endpoint=endpoint).dec()
+            logger.info(f"request_id={request_id} endpoint={endpoint} status={response.status_code} "
+                        f"duration_ms={elapsed * 1000:.0f}")
+        response.call_on_close(finish)
+    return response
+
+MODEL_ENDPOINTS = {"transcribe", "start_stream", "feed_stream", "end_stream"}
+
+@app.before_request
+def require_model():
+    """Model-backed endpoints answer 503 until loading and warm-up are done"""
+    if request.endpoint in MODEL_ENDPOINTS and not stt_service.ready.is_set():
+        return jsonify({"error": "STT model is still loading"}), 503, {"Retry-After": "5"}
 
 @app.route('/health', methods=['GET'])
 def health():
-    """Health check endpoint"""
+    """Liveness check: the process is up, whether or not the model has loaded"""
     return jsonify({
         "status": "healthy",
+        "ready": stt_service.ready.is_set(),
+        "profile": STTConfig.PROFILE,
         "device": STTConfig.DEVICE,
         "model_size": STTConfig.MODEL_SIZE,
-        "service": "stt"
+        "compute_type": STTConfig.COMPUTE_TYPE,
+        "model_load_seconds": stt_service.load_seconds,
+        "service": "stt",
+        "batching": stt_service.scheduler.get_metrics() if stt_service.scheduler else None
     })
 
+@app.route('/ready', methods=['GET'])
+def ready():
+    """Readiness check: 200 once the model is loaded and warmed up"""
+    if stt_service.ready.is_set():
+        return jsonify({"status": "ready"})
+    status = "failed" if stt_service.load_error else "loading"
+    return jsonify({"status": status, "error": stt_service.load_error}), 503
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus metrics"""
+    return Response(generate_latest(), content_type=CONTENT_TYPE_LATEST)
+
 @app.route('/languages', methods=['GET'])
 def get_languages():
     """Get supported languages"""
@@ -208,27 +599,83 @@ def transcribe():
                 "error": f"Unsupported format. Use: {STTConfig.SUPPORTED_FORMATS}"
             }), 400
         
-        # Save uploaded file temporarily
-        audio_id = str(uuid.uuid4())
-        temp_path = f"{STTConfig.CACHE_DIR}/{audio_id}.{file_ext}"
-        audio_file.save(temp_path)
-        
-        try:
-            # Transcribe audio
-            result = stt_service.transcribe_audio(temp_path, language)
-            return jsonify(result)
-            
-        finally:
-            # Cleanup temp file
-            try:
-                os.unlink(temp_path)
-            except:
-                pass
+        # Decode the upload stream directly in memory
+        result = stt_service.transcribe_audio(audio_file.stream, language)
+        return jsonify(result)
         
     except Exception as e:
         logger.error(f"Transcription endpoint error: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
+@app.route('/transcribe/stream', methods=['POST'])
+def start_stream():
+    """
+    Start a streaming transcription
+    
+    POST raw 16-bit little-endian mono PCM at 16 kHz to /transcribe/stream/<id> as it is
+    recorded; each call returns the partial/final segments completed so far. Finish with
+    /transcribe/stream/<id>/end.
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        language = data.get('language', None)
+        if language == 'auto':
+            language = None
+        
+        sample_rate = int(data.get('sample_rate', STTConfig.SAMPLE_RATE))
+        if sample_rate != STTConfig.SAMPLE_RATE:
+            return jsonify({"error": f"Streaming audio must be 16-bit mono PCM at {STTConfig.SAMPLE_RATE} Hz"}), 400
+        
+        expire_stream_sessions()
+        session_id = str(uuid.uuid4())
+        with stream_sessions_lock:
+            stream_sessions[session_id] = StreamingSession(stt_service.transcribe_audio, language)
+        
+        return jsonify({"session_id": session_id, "sample_rate": STTConfig.SAMPLE_RATE, "encoding": "pcm_s16le"})
+        
+    except Exception as e:
+        logger.error(f"Stream start error: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/transcribe/stream/<session_id>', methods=['POST'])
+def feed_stream(session_id: str):
+    """Append audio frames to a stream and return newly completed segments"""
+    session = stream_sessions.get(session_id)
+    if session is None:
+        return jsonify({"error": "Unknown or expired stream"}), 404
+    
+    try:
+        with session.lock:
+            events = []
+            # The body may arrive chunked; process it frame by frame as it is read
+            while True:
+                frame = request.stream.read(STTConfig.SAMPLE_RATE)  # 0.5 s of 16-bit audio
+                if not frame:
+                    break
+                events.extend(session.feed(frame))
+        return jsonify({"events": events})
+        
+    except Exception as e:
+        logger.error(f"Stream transcription error: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/transcribe/stream/<session_id>/end', methods=['POST'])
+def end_stream(session_id: str):
+    """Finalize a stream and return its remaining segments plus the full transcript"""
+    with stream_sessions_lock:
+        session = stream_sessions.pop(session_id, None)
+    if session is None:
+        return jsonify({"error": "Unknown or expired stream"}), 404
+    
+    try:
+        with session.lock:
+            events = session.close()
+        return jsonify({"events": events, "text": " ".join(session.final_texts), "language": session.language})
+        
+    except Exception as e:
+        logger.error(f"Stream end error: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
 @app.route('/transcribe_url', methods=['POST'])
 def transcribe_url():
     """Transcribe audio from URL"""
@@ -1,14 +1,23 @@
 import os
+import re
+import json
+import struct
+import hashlib
+import time
+import threading
 import logging
-from typing import Dict, Optional
-from flask import Flask, request, jsonify, send_file
+from typing import Dict, Iterator, List, Optional
+from flask import Flask, Response, g, request, jsonify, send_file, stream_with_context
 from flask_cors import CORS
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
 import torch
 from TTS.api import TTS
 import tempfile
 import io
 import uuid
 from pathlib import Path
+import numpy as np
+import soundfile as sf
 
 # Configure logging per CLAUDE.md standards
 logging.basicConfig(level=logging.INFO)
@@ -19,18 +28,97 @@ class TTSConfig:
     DEFAULT_SPEAKER = "female_1"
     SAMPLE_RATE = 22050
     SUPPORTED_FORMATS = ["wav", "mp3"]
-    MAX_TEXT_LENGTH = 1000
+    MAX_TEXT_LENGTH = 1000  # per model call; longer text is segmented
+    MAX_TOTAL_TEXT_LENGTH = 20000
+    SEGMENT_MAX_CHARS = 250  # sentences are packed into segments up to this size
+    MODEL_NAME = "tts_models/en/ljspeech/glow-tts"
     CACHE_DIR = "/tmp/tts_cache"
+    CACHE_MAX_BYTES = int(os.getenv("TTS_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+    # Files used this recently are never evicted: a request may be about to open them
+    CACHE_MIN_AGE_SECONDS = int(os.getenv("TTS_CACHE_MIN_AGE_SECONDS", "60"))
+    # Performance profiles: device and torch intra-op threads per deployment target
+    PROFILES = {
+        "cpu": {"device": "cpu", "num_threads": 4},
+        "gpu": {"device": "cuda", "num_threads": 2},
+    }
+    PROFILE = os.getenv("TTS_PROFILE", "gpu" if torch.cuda.is_available() else "cpu")
+    DEVICE = PROFILES[PROFILE]["device"]
+    NUM_THREADS = int(os.getenv("TTS_NUM_THREADS", PROFILES[PROFILE]["num_threads"]))
+    WARMUP_TEXT = "Welcome to the restaurant."
+
+# Prometheus metrics, served on /metrics
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+REQUEST_SECONDS = Histogram("http_request_duration_seconds", "HTTP request duration, until the last byte of the response",
+                            ["endpoint", "method", "status"], buckets=LATENCY_BUCKETS)
+REQUESTS_IN_FLIGHT = Gauge("http_requests_in_flight", "Requests currently being served", ["endpoint"])
+SYNTHESIS_SECONDS = Histogram("tts_synthesis_seconds", "Model time per synthesis call", buckets=LATENCY_BUCKETS)
+SYNTHESIS_CHARS = Histogram("tts_synthesis_characters", "Characters per synthesis call",
+                            buckets=(16, 32, 64, 128, 256, 512, 1000))
+CACHE_LOOKUPS = Counter("tts_cache_lookups_total", "Audio cache lookups by result (hit or miss)", ["result"])
+MODEL_LOAD_SECONDS = Gauge("tts_model_load_seconds", "Model load and warm-up time")
+MODEL_READY = Gauge("tts_model_ready", "1 once the model is loaded and warmed up")
+
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?;:])[\"')\]]*\s+|\n+")
+
+def segment_text(text: str, max_chars: int = TTSConfig.SEGMENT_MAX_CHARS) -> List[str]:
+    """
+    Split text into sentence-aligned segments for synthesis
+    
+    Args:
+        text: Text to split
+        max_chars: Segment size; consecutive short sentences are batched up to it
+        
+    Returns:
+        List of segments, each at most max(max_chars, longest word) characters
+    """
+    segments = []
+    current = ""
+    for sentence in SENTENCE_BOUNDARY.split(text):
+        sentence = sentence.strip()
+        if not sentence:
+            continue
+        
+        # Sentences longer than a segment are cut at word boundaries
+        while len(sentence) > max_chars:
+            cut = sentence.rfind(" ", 0, max_chars)
+            if cut <= 0:
+                cut = max_chars
+            if current:
+                segments.append(current)
+                current = ""
+            segments.append(sentence[:cut].strip())
+            sentence = sentence[cut:].strip()
+        
+        if current and len(current) + 1 + len(sentence) > max_chars:
+            segments.append(current)
+            current = sentence
+        else:
+            current = f"{current} {sentence}".strip()
+    
+    if current:
+        segments.append(current)
+    return segments
+
+def streaming_wav_header(sample_rate: int, channels: int = 1, bits_per_sample: int = 16) -> bytes:
+    """WAV header with unknown (maximal) length, for audio that is streamed as it is synthesized"""
+    byte_rate = sample_rate * channels * bits_per_sample // 8
+    block_align = channels * bits_per_sample // 8
+    return (b"RIFF" + struct.pack("<I", 0xFFFFFFFF) + b"WAVE"
+            + b"fmt " + struct.pack("<IHHIIHH", 16, 1, channels, sample_rate, byte_rate, block_align, bits_per_sample)
+            + b"data" + struct.pack("<I", 0xFFFFFFFF))
 
 class TTSService:
     """Text-to-Speech service with configurable voices and accents"""
     
     def __init__(self):
-        self.device = "cuda" if torch.cuda.is_available() else "cpu"
-        logger.info(f"Initializing TTS service on device: {self.device}")
+        self.device = TTSConfig.DEVICE
         
-        # Initialize Coqui TTS with glow-tts model (no license prompt)
-        self.tts = TTS("tts_models/en/ljspeech/glow-tts").to(self.device)
+        # The model is created by load() in the background
+        self.tts = None
+        self.sample_rate = TTSConfig.SAMPLE_RATE
+        self.ready = threading.Event()
+        self.load_error: Optional[str] = None
+        self.load_seconds: Optional[float] = None
         
         # Available voices/accents configuration
         self.voice_configs = {
@@ -43,7 +131,72 @@ class TTSService:
         
         # Ensure cache directory exists
         Path(TTSConfig.CACHE_DIR).mkdir(exist_ok=True)
-        logger.info("TTS service initialized successfully")
+        
+        # Per-key locks so concurrent requests for the same audio synthesize it only once
+        self.inflight_locks: Dict[str, threading.Lock] = {}
+        self.inflight_guard = threading.Lock()
+        self.cache_hits = 0
+        self.cache_misses = 0
+    
+    def load(self) -> None:
+        """Load the TTS model for the configured profile and warm it up"""
+        try:
+            started = time.monotonic()
+            logger.info(f"Loading TTS model ({TTSConfig.PROFILE} profile) on device: {self.device}")
+            torch.set_num_threads(TTSConfig.NUM_THREADS)
+            
+            # Initialize Coqui TTS with glow-tts model (no license prompt)
+            self.tts = TTS(TTSConfig.MODEL_NAME).to(self.device)
+            self.sample_rate = getattr(self.tts.synthesizer, "output_sample_rate", None) or TTSConfig.SAMPLE_RATE
+            
+            # Warm-up so the first real request doesn't pay for kernel selection and allocations
+            self.tts.tts(text=TTSConfig.WARMUP_TEXT)
+            
+            self.load_seconds = round(time.monotonic() - started, 2)
+            MODEL_LOAD_SECONDS.set(self.load_seconds)
+            MODEL_READY.set(1)
+            self.ready.set()
+            logger.info(f"TTS service initialized successfully in {self.load_seconds}s")
+            
+        except Exception as e:
+            self.load_error = str(e)
+            logger.error(f"TTS model loading failed: {str(e)}")
+    
+    def start_loading(self) -> None:
+        """Load the model on a background thread so the HTTP server (and liveness) is up immediately"""
+        threading.Thread(target=self.load, name="tts-model-loader", daemon=True).start()
+    
+    def _cache_key(self, text: str, voice_config: Dict, format: str) -> str:
+        """Content address of a synthesis: hash of (text, voice, format, model)"""
+        payload = json.dumps([text, voice_config["speaker"], voice_config["language"], format, TTSConfig.MODEL_NAME])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+    
+    def _evict_cache(self, keep_path: str) -> None:
+        """Delete least recently used audio files until the cache fits in CACHE_MAX_BYTES
+        
+        Hits touch their file under the key lock, so skipping recently used files keeps
+        eviction from unlinking a path another request has been handed but not opened yet.
+        """
+        entries = []
+        for entry in os.scandir(TTSConfig.CACHE_DIR):
+            if entry.is_file() and not entry.name.endswith(".tmp"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total_size <= TTSConfig.CACHE_MAX_BYTES:
+                break
+            if path == keep_path:
+                continue
+            try:
+                # Stat again rather than trusting the scan: a hit may have touched it since
+                if time.time() - os.stat(path).st_mtime < TTSConfig.CACHE_MIN_AGE_SECONDS:
+                    continue
+                os.unlink(path)
+                total_size -= size
+            except FileNotFoundError:
+                pass
     
     def synthesize_speech(self, text: str, voice: str = "neutral", 
                          format: str = "wav") -> Optional[str]:
@@ -59,8 +212,8 @@ class TTSService:
             Path to generated audio file or None if failed
         """
         try:
-            if len(text) > TTSConfig.MAX_TEXT_LENGTH:
-                raise ValueError(f"Text too long. Max {TTSConfig.MAX_TEXT_LENGTH} characters")
+            if len(text) > TTSConfig.MAX_TOTAL_TEXT_LENGTH:
+                raise ValueError(f"Text too long. Max {TTSConfig.MAX_TOTAL_TEXT_LENGTH} characters")
             
             if voice not in self.voice_configs:
                 logger.warning(f"Unknown voice '{voice}', using default")
@@ -68,19 +221,54 @@ class TTSService:
             
             voice_config = self.voice_configs[voice]
             
-            # Generate unique filename
-            audio_id = str(uuid.uuid4())
-            output_path = f"{TTSConfig.CACHE_DIR}/{audio_id}.{format}"
+            # Content-addressed filename: identical requests map to the same file
+            cache_key = self._cache_key(text, voice_config, format)
+            output_path = f"{TTSConfig.CACHE_DIR}/{cache_key}.{format}"
+            
+            with self.inflight_guard:
+                key_lock = self.inflight_locks.setdefault(cache_key, threading.Lock())
             
-            # Synthesize speech
-            logger.debug(f"Synthesizing text with voice '{voice}': {text[:50]}...")
+            try:
+                with key_lock:
+                    try:
+                        # Touch so eviction sees it as recently used (and leaves it alone while it is served)
+                        os.utime(output_path)
+                    except FileNotFoundError:
+                        pass  # Not cached, or evicted a moment ago: synthesize it below
+                    else:
+                        self.cache_hits += 1
+                        CACHE_LOOKUPS.labels(result="hit").inc()
+                        logger.debug(f"TTS cache hit: {output_path}")
+                        return output_path
+                
+                    self.cache_misses += 1
+                    CACHE_LOOKUPS.labels(result="miss").inc()
+                
+                    # Synthesize speech into a temp file, then rename atomically into the cache
+                    logger.debug(f"Synthesizing text with voice '{voice}': {text[:50]}...")
+                    temp_path = f"{output_path}.{uuid.uuid4()}.tmp"
+                    try:
+                        if len(text) > TTSConfig.MAX_TEXT_LENGTH:
+                            self._synthesize_segmented(text, voice, temp_path)
+                        else:
+                            started = time.perf_counter()
+                            self.tts.tts_to_file(
+                                text=text,
+                                speaker=voice_config["speaker"],
+                                language=voice_config["language"],
+                                file_path=temp_path
+                            )
+                            SYNTHESIS_SECONDS.observe(time.perf_counter() - started)
+                            SYNTHESIS_CHARS.observe(len(text))
+                        os.replace(temp_path, output_path)
+                    finally:
+                        if os.path.exists(temp_path):
+                            os.unlink(temp_path)
+            finally:
+                with self.inflight_guard:
+                    self.inflight_locks.pop(cache_key, None)
             
-            self.tts.tts_to_file(
-                text=text,
-                speaker=voice_config["speaker"],
-                language=voice_config["language"],
-                file_path=output_path
-            )
+            self._evict_cache(keep_path=output_path)
             
             logger.info(f"Speech synthesized successfully: {output_path}")
             return output_path
@@ -89,6 +277,34 @@ class TTSService:
             logger.error(f"TTS synthesis failed: {str(e)}")
             return None
     
+    def _synthesize_segmented(self, text: str, voice: str, output_path: str) -> None:
+        """Synthesize long text segment by segment into one WAV, holding one segment in memory at a time"""
+        with sf.SoundFile(output_path, mode="w", samplerate=self.sample_rate, channels=1,
+                          subtype="PCM_16", format="WAV") as output:
+            for pcm in self.synthesize_segments(text, voice):
+                output.write(np.frombuffer(pcm, dtype=np.int16))
+    
+    def synthesize_segments(self, text: str, voice: str = "neutral") -> Iterator[bytes]:
+        """
+        Synthesize text sentence segment by sentence segment
+        
+        Args:
+            text: Text of any length
+            voice: Voice/accent identifier
+            
+        Yields:
+            16-bit mono PCM frames for each segment, in order, as soon as it is synthesized
+        """
+        for segment in segment_text(text):
+            # Each segment goes through the audio cache on its own
+            segment_path = self.synthesize_speech(segment, voice, "wav")
+            if not segment_path:
+                raise RuntimeError(f"Synthesis failed for segment: {segment[:50]}...")
+            audio, _ = sf.read(segment_path, dtype="int16")
+            if audio.ndim > 1:
+                audio = audio[:, 0]
+            yield audio.tobytes()
+    
     def get_available_voices(self) -> Dict[str, Dict]:
         """Get list of available voices/accents"""
         return self.voice_configs
@@ -97,18 +313,69 @@ class TTSService:
 app = Flask(__name__)
 CORS(app, resources={r"/*": {"origins": "*", "allow_headers": "*", "expose_headers": "*"}})
 
-# Initialize TTS service
+# Initialize TTS service; the model loads in the background
 tts_service = TTSService()
+tts_service.start_loading()
+
+@app.before_request
+def start_request():
+    # Request ID forwarded by the backend gateway, so timings can be matched across services
+    g.request_id = request.headers.get('X-Request-ID') or uuid.uuid4().hex
+    g.started = time.perf_counter()
+    if request.endpoint != 'metrics':
+        REQUESTS_IN_FLIGHT.labels(endpoint=request.endpoint or 'unknown').inc()
+
+@app.after_request
+def finish_request(response):
+    response.headers['X-Request-ID'] = g.request_id
+    if request.endpoint != 'metrics':
+        endpoint, method, started, request_id = request.endpoint or 'unknown', request.method, g.started, g.request_id
+        
+        # Streamed responses are only finished once the body has been sent
+        def finish():
+            elapsed = time.perf_counter() - started
+            REQUEST_SECONDS.labels(endpoint=endpoint, method=method, status=response.status_code).observe(elapsed)
+            REQUESTS_IN_FLIGHT.labels(endpoint=endpoint).dec()
+            logger.info(f"request_id={request_id} endpoint={endpoint} status={response.status_code} "
+                        f"duration_ms={elapsed * 1000:.0f}")
+        response.call_on_close(finish)
+    return response
+
+MODEL_ENDPOINTS = {"synthesize", "synthesize_stream"}
+
+@app.before_request
+def require_model():
+    """Model-backed endpoints answer 503 until loading and warm-up are done"""
+    if request.endpoint in MODEL_ENDPOINTS and not tts_service.ready.is_set():
+        return jsonify({"error": "TTS model is still loading"}), 503, {"Retry-After": "5"}
+
+@app.route('/ready', methods=['GET'])
+def ready():
+    """Readiness check: 200 once the model is loaded and warmed up"""
+    if tts_service.ready.is_set():
+        return jsonify({"status": "ready"})
+    status = "failed" if tts_service.load_error else "loading"
+    return jsonify({"status": status, "error": tts_service.load_error}), 503
 
 @app.route('/health', methods=['GET'])
 def health():
-    """Health check endpoint"""
+    """Liveness check: the process is up, whether or not the model has loaded"""
     return jsonify({
         "status": "healthy",
+        "ready": tts_service.ready.is_set(),
+        "profile": TTSConfig.PROFILE,
         "device": tts_service.device,
-        "service": "tts"
+        "model_load_seconds": tts_service.load_seconds,
+        "service": "tts",
+        "cache_hits": tts_service.cache_hits,
+        "cache_misses": tts_service.cache_misses
     })
 
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus metrics"""
+    return Response(generate_latest(), content_type=CONTENT_TYPE_LATEST)
+
 @app.route('/voices', methods=['GET'])
 def get_voices():
     """Get available voices/accents"""
@@ -152,5 +419,38 @@ def synthesize():
         logger.error(f"Synthesis endpoint error: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
+@app.route('/synthesize/stream', methods=['POST'])
+def synthesize_stream():
+    """Synthesize text of any length, streaming audio as each sentence segment is ready"""
+    data = request.json or {}
+    text = data.get('text', '')
+    voice = data.get('voice', 'neutral')
+    format = data.get('format', 'wav')
+    
+    if not text:
+        return jsonify({"error": "Text is required"}), 400
+    
+    if len(text) > TTSConfig.MAX_TOTAL_TEXT_LENGTH:
+        return jsonify({"error": f"Text too long. Max {TTSConfig.MAX_TOTAL_TEXT_LENGTH} characters"}), 400
+    
+    if format not in ("wav", "pcm"):
+        return jsonify({"error": "Format must be one of ['wav', 'pcm']"}), 400
+    
+    def generate():
+        if format == "wav":
+            yield streaming_wav_header(tts_service.sample_rate)
+        try:
+            for pcm in tts_service.synthesize_segments(text, voice):
+                yield pcm
+        except Exception as e:
+            # Headers are already sent; end the stream early
+            logger.error(f"Streaming synthesis error: {str(e)}")
+    
+    mimetype = "audio/wav" if format == "wav" else f"audio/L16; rate={tts_service.sample_rate}; channels=1"
+    return Response(stream_with_context(generate()), mimetype=mimetype, headers={
+        'X-Sample-Rate': str(tts_service.sample_rate),
+        'X-Accel-Buffering': 'no'
+    })
+
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=8001, debug=False)
\ No newline at end of file
@@ -0,0 +1,69 @@
+import json
+import os
+import subprocess
+import sys
+import textwrap
+
+from conftest import BACKEND_DIR
+
+# An entry script in the style of an unguarded main.py: all work happens at import time,
+# so every spawned worker re-runs it as __mp_main__
+UNGUARDED_ENTRY = textwrap.dedent("""
+    import json
+    import sys
+    from document_loaders import ParallelDocumentLoader
+
+    results = list(ParallelDocumentLoader(max_workers=2).load(sys.argv[1:]))
+    print(json.dumps({path: [len(chunks or []), repr(error) if error else None] for path, chunks, error in results}))
+""")
+
+
+def write_pairs(path, n_pairs):
+    pairs = [{"prompt": f"Question {i}?", "response": f"Answer {i}."} for i in range(n_pairs)]
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"Service": pairs}, f)
+
+
+def run_entry(tmp_path, source, paths):
+    script = tmp_path / "entry.py"
+    script.write_text(source)
+    env = dict(os.environ, PYTHONPATH=BACKEND_DIR)
+    completed = subprocess.run([sys.executable, str(script), *paths], cwd=tmp_path, env=env,
+                               capture_output=True, text=True, timeout=300)
+    assert completed.returncode == 0, completed.stderr
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def test_parallel_load_from_unguarded_entry_module(tmp_path):
+    paths = []
+    for i in range(4):
+        path = tmp_path / f"pairs_{i}.json"
+        write_pairs(path, i + 1)
+        paths.append(str(path))
+
+    results = run_entry(tmp_path, UNGUARDED_ENTRY, paths)
+
+    assert results == {path: [i + 1, None] for i, path in enumerate(paths)}
+
+
+def test_parallel_load_from_guarded_entry_module(tmp_path):
+    paths = []
+    for i in range(3):
+        path = tmp_path / f"pairs_{i}.json"
+        write_pairs(path, 2)
+        paths.append(str(path))
+    guarded = UNGUARDED_ENTRY.replace("\nresults =", "\nif __name__ == '__main__':\n    results =").replace(
+        "\nprint(", "\n    print(")
+
+    results = run_entry(tmp_path, guarded, paths)
+
+    assert results == {path: [2, None] for path in paths}
+
+
+def test_entry_points_are_import_safe(tmp_path):
+    # Importing main.py must not build a RAG (or prompt for input), as spawned workers do exactly that
+    env = dict(os.environ, PYTHONPATH=BACKEND_DIR)
+    completed = subprocess.run([sys.executable, "-c", "import main; assert not hasattr(main, 'rag')"],
+                               cwd=tmp_path, env=env, capture_output=True, text=True, timeout=300,
+                               stdin=subprocess.DEVNULL)
+    assert completed.returncode == 0, completed.stderr
@@ -0,0 +1,28 @@
+import numpy as np
+
+from local_vector_store import LocalVectorStore
+
+
+class StubEmbeddings():
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+    def embed_query(self, text):
+        return np.random.default_rng(len(text)).standard_normal(8).tolist()
+
+
+def test_add_after_reloading_an_emptied_store(tmp_path):
+    embeddings = StubEmbeddings()
+    store = LocalVectorStore(embeddings, str(tmp_path))
+    ids = store.add_texts(["carry plates on the left", "pour wine from the right"])
+    store.flush()
+    store.delete(ids)
+    store.flush()
+
+    reloaded = LocalVectorStore(embeddings, str(tmp_path))
+    assert reloaded.count() == 0
+    reloaded.add_texts(["greet guests at the door"])
+    reloaded.flush()
+
+    results = LocalVectorStore(embeddings, str(tmp_path)).similarity_search("greet guests at the door", k=1)
+    assert [document.page_content for document in results] == ["greet guests at the door"]
@@ -0,0 +1,26 @@
+import pytest
+
+from model import mentions_metadata_filter, source_names
+
+SOURCES = source_names(["/app/docs/manuals/Training_Manual_for_waiters-1.pdf", "/app/docs/prompt_response_pairs.json"])
+
+
+@pytest.mark.parametrize("question", [
+    "What are the lunch/dinner specials?",
+    "Are and/or substitutions allowed?",
+    "How do I file a complaint about a guest?",
+    "What is the source of this sauce?",
+    "Which path should I take to the patio?",
+])
+def test_ordinary_questions_skip_self_query(question):
+    assert not mentions_metadata_filter(question, SOURCES)
+
+
+@pytest.mark.parametrize("question", [
+    "What does menu.pdf say about allergens?",
+    "Summarize the notes.txt file",
+    "What does Training_Manual_for_waiters-1 say about carrying trays?",
+    "According to prompt_response_pairs.json, how do I greet guests?",
+])
+def test_file_names_trigger_self_query(question):
+    assert mentions_metadata_filter(question, SOURCES)
@@ -0,0 +1,47 @@
+import importlib
+import sys
+
+import pytest
+
+from bulk_ingest import BulkIngestor
+from milvus_index import MilvusIndexConfig
+
+
+def test_malformed_settings_do_not_break_import(monkeypatch):
+    monkeypatch.setenv("RAG_VECTOR_SEARCH_TIMEOUT", "three")
+    monkeypatch.setenv("RAG_EMBED_BATCH_SIZE", "lots")
+    monkeypatch.setenv("MILVUS_INDEX_PARAMS", "{not json")
+    for name in ("model", "bulk_ingest", "milvus_index"):
+        monkeypatch.delitem(sys.modules, name, raising=False)
+        importlib.import_module(name)
+
+
+def test_settings_are_read_at_construction(monkeypatch):
+    monkeypatch.setenv("MILVUS_INDEX_TYPE", "ivf_flat")
+    monkeypatch.setenv("MILVUS_SEARCH_PARAMS", '{"nprobe": 32}')
+    config = MilvusIndexConfig()
+    assert config.index_type == "IVF_FLAT"
+    assert config.search_params == {"nprobe": 32}
+    assert MilvusIndexConfig(index_type="HNSW", search_params={}).search_params == {"ef": 64}
+
+    monkeypatch.setenv("RAG_EMBED_CONCURRENCY", "2")
+    with BulkIngestor(vector_store=None) as bulk:
+        assert bulk.max_concurrency == 2
+
+
+@pytest.mark.parametrize("name, value", [
+    ("MILVUS_INDEX_PARAMS", "{not json"),
+    ("MILVUS_SEARCH_PARAMS", "[16]"),
+    ("MILVUS_INDEX_TYPE", "ANNOY"),
+])
+def test_malformed_milvus_settings_name_the_variable(monkeypatch, name, value):
+    monkeypatch.setenv(name, value)
+    with pytest.raises(ValueError, match=name):
+        MilvusIndexConfig()
+
+
+@pytest.mark.parametrize("value", ["lots", "0"])
+def test_malformed_bulk_settings_are_rejected(monkeypatch, value):
+    monkeypatch.setenv("RAG_EMBED_BATCH_SIZE", value)
+    with pytest.raises(ValueError, match="RAG_EMBED_BATCH_SIZE|positive"):
+        BulkIngestor(vector_store=None)
@@ -0,0 +1,41 @@
+import threading
+import time
+
+import pytest
+
+from speech_client import CachedResource
+
+
+def test_concurrent_cold_gets_share_one_fetch():
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        time.sleep(0.2)
+        return {"voices": ["neutral"]}
+
+    resource = CachedResource(fetch, ttl=60)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(resource.get())) for _ in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert len(results) == 10 and all(payload == {"voices": ["neutral"]} for payload, _ in results)
+
+
+def test_failed_cold_fetch_is_raised_and_retried():
+    outcomes = [RuntimeError("upstream down"), {"languages": {"en": "English"}}]
+
+    def fetch():
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    resource = CachedResource(fetch, ttl=60)
+    with pytest.raises(RuntimeError):
+        resource.get()
+    assert resource.get()[0] == {"languages": {"en": "English"}}
@@ -0,0 +1,43 @@
+from speech_pipeline import SentenceSplitter
+
+
+def split(*tokens, **kwargs):
+    splitter = SentenceSplitter(**kwargs)
+    sentences = []
+    for token in tokens:
+        sentences.extend(splitter.feed(token))
+    return sentences + splitter.flush()
+
+
+def test_splits_on_punctuation_followed_by_whitespace():
+    assert split("Welcome the guests warmly. ", "Then offer them water! ", "Anything else?") == [
+        "Welcome the guests warmly.", "Then offer them water!", "Anything else?"]
+
+
+def test_splits_without_whitespace_before_a_capital():
+    assert split("How are you doing today?", "Fine, thank you for asking.") == [
+        "How are you doing today?", "Fine, thank you for asking."]
+
+
+def test_does_not_split_inside_initialisms():
+    assert split("Our partners in the U.S.A like this wine a lot.") == [
+        "Our partners in the U.S.A like this wine a lot."]
+
+
+def test_list_markers_start_the_next_item():
+    assert split("1. Greet the guest. 2. Offer water. 3. Take the order.") == [
+        "1. Greet the guest.", "2. Offer water.", "3. Take the order."]
+
+
+def test_list_markers_across_tokens():
+    assert split("1. Greet the", " guest. 2", ". Offer water.") == ["1. Greet the guest.", "2. Offer water."]
+
+
+def test_short_fragments_are_merged():
+    assert split("Yes. ", "Always check the allergy list first. ") == ["Yes. Always check the allergy list first."]
+
+
+def test_long_text_is_cut_at_word_boundaries():
+    sentences = split("word " * 200, max_chars=50)
+    assert all(len(sentence) <= 50 for sentence in sentences)
+    assert " ".join(sentences).split() == ["word"] * 200
@@ -0,0 +1,168 @@
+import importlib
+import os
+import sys
+import threading
+import time
+from collections import namedtuple
+
+import numpy as np
+import pytest
+
+pytest.importorskip("torch")
+faster_whisper = pytest.importorskip("faster_whisper")
+
+SPEECH_SERVICES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "speech_services")
+SAMPLE_RATE = 16000
+
+Segment = namedtuple("Segment", ["start", "end", "text", "avg_logprob"])
+
+
+class UnavailableWhisperModel():
+    """Makes the background load that runs on import fail at once instead of downloading a model."""
+
+    def __init__(self, *args, **kwargs):
+        raise RuntimeError("no model in tests")
+
+
+class StubWhisperModel():
+    def detect_language(self, audio):
+        return "en", 0.9, None
+
+
+class StubBatchedPipeline():
+    """Two segments per clip; each segment's text names the clip's first sample, so tests can tell clips apart."""
+
+    def __init__(self):
+        self.calls = []
+
+    def transcribe(self, audio, language, clip_timestamps, **kwargs):
+        self.calls.append((language, len(clip_timestamps)))
+        segments = []
+        for clip in clip_timestamps:
+            start = clip["start"] / SAMPLE_RATE
+            marker = int(audio[clip["start"]])
+            segments.append(Segment(start + 0.1, start + 0.5, f" clip{marker} first", -0.1))
+            segments.append(Segment(start + 0.5, start + 0.9, f" clip{marker} second", -0.2))
+        return iter(segments), None
+
+
+@pytest.fixture(scope="module")
+def stt():
+    original = faster_whisper.WhisperModel
+    faster_whisper.WhisperModel = UnavailableWhisperModel
+    sys.path.insert(0, SPEECH_SERVICES_DIR)
+    try:
+        module = importlib.import_module("stt_service")
+    finally:
+        faster_whisper.WhisperModel = original
+    return module
+
+
+@pytest.fixture
+def service(stt, monkeypatch):
+    # One voiced chunk per clip, so segments map to clips without running the real VAD
+    monkeypatch.setattr(stt, "get_speech_timestamps", lambda audio, options: [{"start": 0, "end": len(audio)}])
+    monkeypatch.setattr(stt, "merge_segments", lambda speech, options: speech)
+    service = stt.STTService.__new__(stt.STTService)
+    service.model = StubWhisperModel()
+    service.batched_model = StubBatchedPipeline()
+    service.transcription_settings = {"beam_size": 1, "temperature": 0.0}
+    return service
+
+
+def clip(marker, seconds):
+    audio = np.zeros(int(seconds * SAMPLE_RATE), dtype=np.float32)
+    audio[0] = marker
+    return audio
+
+
+def test_scheduler_batches_concurrent_jobs(stt):
+    batches = []
+    scheduler = stt.TranscriptionScheduler(lambda jobs: batches.append(len(jobs)) or [language for _, language in jobs],
+                                           max_batch_size=8, max_wait_ms=200)
+    futures = [scheduler.submit(np.zeros(10, dtype=np.float32), f"job{i}") for i in range(3)]
+
+    assert [future.result(timeout=5) for future in futures] == ["job0", "job1", "job2"]
+    assert batches == [3]
+
+
+def test_scheduler_flushes_a_partial_batch_after_the_wait(stt):
+    batches = []
+    scheduler = stt.TranscriptionScheduler(lambda jobs: batches.append(len(jobs)) or [None] * len(jobs),
+                                           max_batch_size=8, max_wait_ms=50)
+    started = time.monotonic()
+    scheduler.submit(np.zeros(10, dtype=np.float32), None).result(timeout=5)
+
+    assert batches == [1]
+    assert time.monotonic() - started < 1.0
+
+
+def test_scheduler_caps_batch_size(stt):
+    batches = []
+    release = threading.Event()
+
+    def run_batch(jobs):
+        release.wait(5)
+        batches.append(len(jobs))
+        return [None] * len(jobs)
+
+    scheduler = stt.TranscriptionScheduler(run_batch, max_batch_size=2, max_wait_ms=200)
+    futures = [scheduler.submit(np.zeros(10, dtype=np.float32), None) for _ in range(3)]
+    release.set()
+    for future in futures:
+        future.result(timeout=5)
+
+    assert batches == [2, 1]
+
+
+def test_scheduler_fails_every_job_of_a_failed_batch(stt):
+    def run_batch(jobs):
+        raise RuntimeError("inference failed")
+
+    scheduler = stt.TranscriptionScheduler(run_batch, max_batch_size=8, max_wait_ms=100)
+    futures = [scheduler.submit(np.zeros(10, dtype=np.float32), None) for _ in range(2)]
+
+    for future in futures:
+        with pytest.raises(RuntimeError):
+            future.result(timeout=5)
+
+
+def test_transcribe_batch_maps_segments_back_to_their_clip(service):
+    results = service.transcribe_batch([(clip(1, 2.0), "en"), (clip(2, 3.5), "en"), (clip(3, 1.0), "en")])
+
+    assert [result["text"] for result in results] == [
+        "clip1 first clip1 second", "clip2 first clip2 second", "clip3 first clip3 second"]
+    assert [result["duration"] for result in results] == [2.0, 3.5, 1.0]
+    # Timestamps are relative to each request's own audio, in order
+    for result in results:
+        assert [(segment["start"], segment["end"]) for segment in result["segments"]] == [(0.1, 0.5), (0.5, 0.9)]
+    assert service.batched_model.calls == [("en", 3)]
+
+
+def test_transcribe_batch_groups_by_language(service):
+    results = service.transcribe_batch([(clip(1, 1.0), "es"), (clip(2, 1.0), None), (clip(3, 1.0), "es")])
+
+    assert [result["language"] for result in results] == ["es", "en", "es"]
+    assert [result["text"] for result in results] == [
+        "clip1 first clip1 second", "clip2 first clip2 second", "clip3 first clip3 second"]
+    assert sorted(service.batched_model.calls) == [("en", 1), ("es", 2)]
+
+
+def test_scheduler_returns_each_request_its_own_segments(stt, service):
+    scheduler = stt.TranscriptionScheduler(service.transcribe_batch, max_batch_size=8, max_wait_ms=200)
+    clips = {marker: clip(marker, 1.0 + marker / 2) for marker in range(1, 5)}
+    results = {}
+
+    def request(marker):
+        results[marker] = scheduler.submit(clips[marker], "en").result(timeout=5)
+
+    threads = [threading.Thread(target=request, args=(marker,)) for marker in clips]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    for marker, result in results.items():
+        assert [segment["text"] for segment in result["segments"]] == [f"clip{marker} first", f"clip{marker} second"]
+    assert sum(n_clips for _, n_clips in service.batched_model.calls) == 4
+    assert len(service.batched_model.calls) < 4